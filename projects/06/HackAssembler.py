@@ -1,5 +1,14 @@
 import sys
-import re
+import os
+import glob
+import mmap
+import time
+import argparse
+import functools
+import collections
+import types
+import concurrent.futures
+from array import array
 
 class HackAssembler():
     """
@@ -8,15 +17,29 @@ class HackAssembler():
     Input: ASM file with assembly language instructions
     Output: input converted to machine code output
     """
-
-    def __init__(self, input_file):
-        self.parser = HackAssemblerParser(input_file)
+    def __init__(self, input_file, single_pass=False, output_format=None, bulk=False, optimize=False):
+        if bulk:
+            self.parser = HackAssemblerBulkParser(input_file)
+        else:
+            self.parser = HackAssemblerParser(input_file)
         self.symbol_table = SymbolTable()
+        self.single_pass = single_pass
+        self.output_format = output_format or HackRomFile.TEXT_FORMAT
+        self.optimizer = HackPeepholeOptimizer() if optimize else None
+        # 16 bit machine words, only rendered as text when written out
+        self.machine_codes = array('H')
 
     def run(self):
-        self.parse_for_labels()
-        self.parser.reset()
-        self.translate()
+        # the optimizer changes addresses so labels can only be resolved after it ran
+        if self.single_pass or self.optimizer:
+            self.assemble()
+        else:
+            self.parse_for_labels()
+            self.parser.reset()
+            self.translate()
+
+        self.write_hack_file()
+        self.parser.input_file.close()
 
     # 1st pass
     def parse_for_labels(self):
@@ -41,20 +64,13 @@ class HackAssembler():
         """
         parses for variables @variable_value and translate instructions to machine code
         """
-        hack_file_name = self.parser.input_file.name.split('.')[0] + '.hack'
-        hack_file = open(hack_file_name, 'w+')
-
-        char_only_matcher = re.compile('[a-zA-Z]+')
-
         while self.parser.has_more_lines_to_parse:
             self.parser.advance()
-            machine_code = ''
 
             if self.parser.current_command_type == 'address':
                 symbol = self.parser.symbol()
-                not_number = char_only_matcher.match(symbol)
 
-                if not_number:
+                if self._not_number(symbol):
                     if self.symbol_table.contains(symbol):
                         register_number = self.symbol_table.get_address(symbol)
                     else:
@@ -62,26 +78,112 @@ class HackAssembler():
                 else:
                     register_number = int(symbol)
 
-                machine_code = HackAssemblerDecoder.decimal_to_binary_string(register_number)
+                self.machine_codes.append(register_number)
             elif self.parser.current_command_type == 'computation':
-                # init_bits
-                init_bits = HackAssemblerDecoder.C_COMMAND_INIT_BITS
-                # Comp
-                comp_mnemonic = self.parser.comp_mnemonic()
-                comp_bits = HackAssemblerDecoder.COMP_MNEMONIC_TO_BITS[comp_mnemonic]
-                # Dest
-                dest_mnemonic = self.parser.dest_mnemonic()
-                dest_bits = HackAssemblerDecoder.DEST_MNEMONIC_TO_BITS[dest_mnemonic]
-                # Jump
-                jump_mnemonic = self.parser.jump_mnemonic()
-                jump_bits = HackAssemblerDecoder.JUMP_MNEMONIC_TO_BITS[jump_mnemonic]
+                self.machine_codes.append(self._computation_machine_code())
+
+    # single pass
+    def assemble(self):
+        """
+        resolves labels and translates instructions while reading the input once
+        """
+        commands = self._parsed_commands()
+        if self.optimizer:
+            commands = self.optimizer.optimize(commands)
+
+        self.machine_codes.extend(self.machine_codes_for(commands, self.symbol_table))
+
+    @classmethod
+    def assemble_lines(cls, lines):
+        """
+        assembles any iterable of assembly lines (list, generator, open file) without touching disk
+        yields 16 bit machine words lazily, see machine_codes_for
+        """
+        return cls.machine_codes_for(HackAssemblerBulkParser.iter_commands(lines), SymbolTable())
+
+    @classmethod
+    def machine_codes_for(cls, commands, symbol_table):
+        """
+        generator over (command type, command, symbol) tuples yielding machine words in program order
+        references to labels not defined yet get a placeholder that is back-patched once the label shows up,
+        only words from the first unresolved reference onwards are held back, everything before is yielded right away
+        references still unresolved at the end are variables, allocated in order of first reference like the 2nd pass does
+        """
+        num_instructions = 0
+        # words waiting on unresolved references, pending[0] is the word at address pending_start
+        pending = []
+        pending_start = 0
+        # symbol -> addresses of the instructions waiting for it, in order of first reference
+        unresolved_references = {}
+
+        for command_type, command, symbol in commands:
+            if command_type == 'label':
+                address = symbol_table.add_entry(symbol=symbol, address=num_instructions)
+
+                if symbol in unresolved_references:
+                    for index in unresolved_references.pop(symbol):
+                        pending[index - pending_start] = address
+
+                    # first remaining symbol was referenced earliest so it holds the oldest placeholder
+                    if unresolved_references:
+                        first_unresolved = next(iter(unresolved_references.values()))[0]
+                    else:
+                        first_unresolved = num_instructions
 
-                machine_code = init_bits + comp_bits + dest_bits + jump_bits
+                    yield from pending[:first_unresolved - pending_start]
+                    del pending[:first_unresolved - pending_start]
+                    pending_start = first_unresolved
+                continue
+
+            if command_type == 'address':
+                if symbol.isdigit():
+                    machine_code = int(symbol)
+                elif symbol_table.contains(symbol):
+                    machine_code = symbol_table.get_address(symbol)
+                else:
+                    # placeholder until label is defined or the symbol turns out to be a variable
+                    if not unresolved_references:
+                        pending_start = num_instructions
+                    unresolved_references.setdefault(symbol, []).append(num_instructions)
+                    machine_code = 0
+            else:
+                machine_code = HackAssemblerDecoder.encode_computation(command)
+
+            num_instructions += 1
+            if unresolved_references:
+                pending.append(machine_code)
+            else:
+                yield machine_code
+
+        # never defined as labels so these are variables
+        for symbol, indexes in unresolved_references.items():
+            address = symbol_table.add_entry(symbol)
+
+            for index in indexes:
+                pending[index - pending_start] = address
+
+        yield from pending
+
+    def write_hack_file(self):
+        HackRomFile.write(self.hack_file_name(), self.machine_codes, output_format=self.output_format)
 
-            if len(machine_code) > 0:
-                hack_file.write(machine_code + '\n')
+    def _parsed_commands(self):
+        while self.parser.has_more_lines_to_parse:
+            self.parser.advance()
+
+            if self.parser.current_command_type == 'computation':
+                yield ('computation', self.parser.current_command, None)
+            elif self.parser.current_command_type != 'not_instruction':
+                yield (self.parser.current_command_type, self.parser.current_command, self.parser.symbol())
+
+    def _computation_machine_code(self):
+        return HackAssemblerDecoder.encode_computation(self.parser.current_command)
+
+    def _not_number(self, symbol):
+        return not symbol.isdigit()
 
-        hack_file.close()
+    def hack_file_name(self):
+        return os.path.splitext(self.parser.input_file.name)[0] + HackRomFile.FILE_EXTENSIONS[self.output_format]
 
 
 class HackAssemblerDecoder():
@@ -127,7 +229,14 @@ class HackAssemblerDecoder():
         'D&A': '0000000',
         'D&M': '1000000',
         'D|A': '0010101',
-        'D|M': '1010101'
+        'D|M': '1010101',
+        # commutative spellings, emitted by the VM translators
+        'A+D': '0000010',
+        'M+D': '1000010',
+        'A&D': '0000000',
+        'M&D': '1000000',
+        'A|D': '0010101',
+        'M|D': '1010101'
     }
 
     JUMP_MNEMONIC_TO_BITS = {
@@ -141,13 +250,133 @@ class HackAssemblerDecoder():
         'JMP': '111'
     }
 
+    # integer versions of the tables above with the bits already shifted into place within the 16 bit word
+    C_COMMAND_INIT_CODE = int(C_COMMAND_INIT_BITS, 2) << 13
+    COMP_MNEMONIC_TO_CODE = {
+        mnemonic: int(bits, 2) << 6 for mnemonic, bits in COMP_MNEMONIC_TO_BITS.items() if bits
+    }
+    DEST_MNEMONIC_TO_CODE = {
+        mnemonic: int(bits, 2) << 3 for mnemonic, bits in DEST_MNEMONIC_TO_BITS.items()
+    }
+    JUMP_MNEMONIC_TO_CODE = {
+        mnemonic: int(bits, 2) for mnemonic, bits in JUMP_MNEMONIC_TO_BITS.items()
+    }
+
+    @classmethod
+    def computation_to_machine_code(cls, dest_mnemonic, comp_mnemonic, jump_mnemonic):
+        return (
+            cls.C_COMMAND_INIT_CODE |
+            cls.COMP_MNEMONIC_TO_CODE[comp_mnemonic] |
+            cls.DEST_MNEMONIC_TO_CODE[dest_mnemonic] |
+            cls.JUMP_MNEMONIC_TO_CODE[jump_mnemonic]
+        )
+
+    COMPUTATION_CACHE_SIZE = 1024
+
+    @staticmethod
+    @functools.lru_cache(maxsize=COMPUTATION_CACHE_SIZE)
+    def encode_computation(command):
+        """
+        encodes a whole cleaned C-instruction, i.e., AM=M-1
+        real programs repeat a small set of computations so results are cached by instruction text,
+        see cache_info() for hits / misses
+        """
+        dest_mnemonic, comp_mnemonic, jump_mnemonic = HackAssemblerParser.split_computation(command)
+
+        return HackAssemblerDecoder.computation_to_machine_code(
+            dest_mnemonic=dest_mnemonic,
+            comp_mnemonic=comp_mnemonic,
+            jump_mnemonic=jump_mnemonic
+        )
+
+    @classmethod
+    def cache_info(cls):
+        return cls.encode_computation.cache_info()
+
+    @classmethod
+    def clear_cache(cls):
+        cls.encode_computation.cache_clear()
+
+    @classmethod
+    def machine_codes_to_text(cls, machine_codes):
+        """
+        renders 16 bit machine words as the textual .hack format, one binary string per line
+        """
+        return ''.join(map('{0:016b}\n'.format, machine_codes))
+
     @classmethod
     def decimal_to_binary_string(cls, num):
         return '{0:016b}'.format(num)
 
 
+class HackRomFile():
+    """
+    Reads and writes assembled programs
+    text format: one 16 character binary string per instruction, i.e., .hack
+    binary format: packed rom image with each instruction as a little endian 16 bit word
+    """
+    TEXT_FORMAT = 'text'
+    BINARY_FORMAT = 'binary'
+    FILE_EXTENSIONS = {
+        TEXT_FORMAT  : '.hack',
+        BINARY_FORMAT: '.bin'
+    }
+
+    @classmethod
+    def write(cls, file_name, machine_codes, output_format=TEXT_FORMAT):
+        if output_format == cls.BINARY_FORMAT:
+            cls.write_binary(file_name, machine_codes)
+        else:
+            cls.write_text(file_name, machine_codes)
+
+    @classmethod
+    def write_text(cls, file_name, machine_codes):
+        with open(file_name, 'w') as hack_file:
+            hack_file.write(HackAssemblerDecoder.machine_codes_to_text(machine_codes))
+
+    @classmethod
+    def write_binary(cls, file_name, machine_codes):
+        words = array('H', machine_codes)
+        if sys.byteorder == 'big':
+            words.byteswap()
+
+        with open(file_name, 'wb') as rom_file:
+            words.tofile(rom_file)
+
+    @classmethod
+    def read_text(cls, file_name):
+        with open(file_name, 'r') as hack_file:
+            return array('H', (int(line, 2) for line in hack_file.read().split()))
+
+    @classmethod
+    def load_binary(cls, file_name):
+        """
+        maps a binary rom image into memory and returns it as a memoryview of 16 bit words without copying
+        """
+        with open(file_name, 'rb') as rom_file:
+            # mmap can't map an empty file
+            if os.fstat(rom_file.fileno()).st_size == 0:
+                return memoryview(array('H'))
+
+            rom = mmap.mmap(rom_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if sys.byteorder == 'big':
+            # words are stored little endian so zero copy is only possible on little endian hosts
+            words = array('H', rom)
+            words.byteswap()
+            rom.close()
+            return memoryview(words)
+
+        return memoryview(rom).cast('H')
+
+
 class SymbolTable():
-    PREDEFINED_SYMBOLS = {
+    """
+    Maps labels and variables to addresses for a single assembly run
+    predefined symbols live in a frozen base shared by every table, symbols of the program being
+    assembled go into the table's own dict so creating a table is cheap and runs never leak into each other
+    """
+    PREDEFINED_SYMBOLS = types.MappingProxyType({
         'SP'  : 0,
         'LCL' : 1,
         'ARG' : 2,
@@ -171,14 +400,16 @@ class SymbolTable():
         'R15' : 15,
         'SCREEN': 16384,
         'KBD'   : 24576
-    }
+    })
+    FIRST_VARIABLE_ADDRESS = 16
 
     def __init__(self):
-        self.symbols = self.PREDEFINED_SYMBOLS
-        self.next_available_memory_address = 16
+        self.symbols = {}
+        self.next_available_memory_address = self.FIRST_VARIABLE_ADDRESS
 
     def add_entry(self, symbol=None, address=None):
-        if address:
+        # labels can legitimately sit at address 0
+        if address is not None:
             self.symbols[symbol] = address
         else:
             self.symbols[symbol] = self.next_available_memory_address
@@ -187,10 +418,13 @@ class SymbolTable():
         return self.get_address(symbol)
 
     def contains(self, symbol):
-        return symbol in self.symbols
+        return symbol in self.symbols or symbol in self.PREDEFINED_SYMBOLS
 
     def get_address(self, symbol):
-        return self.symbols[symbol]
+        if symbol in self.symbols:
+            return self.symbols[symbol]
+        else:
+            return self.PREDEFINED_SYMBOLS[symbol]
 
 
 class HackAssemblerParser():
@@ -226,11 +460,26 @@ class HackAssemblerParser():
         if self.current_command.find(self.JUMP_DELIMITER) != -1:
             return self.current_command.split(self.JUMP_DELIMITER)[1]
 
+    @classmethod
+    def split_computation(cls, command):
+        """
+        dest=comp;jump -> (dest, comp, jump) with None for missing dest / jump
+        """
+        dest, _, rest = command.rpartition(cls.DEST_DELIMITER)
+        comp, _, jump = rest.partition(cls.JUMP_DELIMITER)
+
+        return (dest or None, comp, jump or None)
+
     def symbol(self):
         """
         returns decimal number or symbol
         """
-        return ''.join(c for c in self.current_command if c not in '()@/')
+        if self.current_command_type == 'label':
+            # (LABEL)
+            return self.current_command[1:-1]
+        else:
+            # @value
+            return self.current_command[1:]
 
     def advance(self):
         """
@@ -275,6 +524,349 @@ class HackAssemblerParser():
         else:
             self.current_command_type = 'computation'
 
-asm_input_file = sys.argv[1]
-assembler = HackAssembler(asm_input_file)
-assembler.run()
+
+
+class HackAssemblerBulkParser(HackAssemblerParser):
+    """
+    Reads the whole input file at once and cleans / decodes all lines up front
+    same interface as HackAssemblerParser but advancing is just stepping through a list
+    """
+    def __init__(self, input_file):
+        self.input_file = open(input_file, 'r')
+        self.commands = self.parse_lines(self.input_file.read().splitlines())
+        self.reset()
+
+    def reset(self):
+        self.position = 0
+        self.current_command = None
+        self.current_command_type = None
+        self.current_operand = None
+        self.has_more_lines_to_parse = len(self.commands) > 0
+
+    def advance(self):
+        self.current_command_type, self.current_command, self.current_operand = self.commands[self.position]
+        self.position += 1
+        self.has_more_lines_to_parse = self.position < len(self.commands)
+
+    def symbol(self):
+        return self.current_operand
+
+    @classmethod
+    def parse_lines(cls, lines):
+        """
+        returns (command type, command, symbol) for every line holding an instruction, see iter_commands()
+        computations are split by the inherited dest / comp / jump_mnemonic() only when asked for,
+        the assembler encodes them from their text, see HackAssemblerDecoder.encode_computation()
+        """
+        return list(cls.iter_commands(lines))
+
+    @classmethod
+    def iter_commands(cls, lines):
+        """
+        lazily yields (command type, command, symbol) for every line holding an instruction
+        symbol is None for computations
+        """
+        for line in lines:
+            # remove comments and whitespace
+            if '//' in line:
+                line = line.partition('//')[0]
+            command = line.strip()
+
+            if not command:
+                continue
+            elif command[0] == '@':
+                yield ('address', command, command[1:])
+            elif command[0] == '(':
+                yield ('label', command, command[1:-1])
+            else:
+                yield ('computation', command, None)
+
+class HackPeepholeOptimizer():
+    """
+    Removes wasteful instruction sequences from a parsed (command type, command, symbol) stream before encoding
+    labels are treated as barriers since control can arrive there from anywhere
+    every Hack instruction takes one cycle so each removed instruction saves a cycle whenever its code runs
+    removing instructions moves the ones after them, only jumps to labels follow, jumps to numeric addresses are rejected
+    """
+    ROM_SIZE = 32768
+    # @SP M=M+1 @SP AM=M-1, i.e., push immediately popped again: SP ends up unchanged and A at the old top
+    PUSH_POP_ROUND_TRIP = ['@SP', 'M=M+1', '@SP', 'AM=M-1']
+    PUSH_POP_REPLACEMENT = [('address', '@SP', 'SP'), ('computation', 'A=M', None)]
+
+    def __init__(self):
+        self.original_size = 0
+        self.optimized_size = 0
+        self.removed_instructions = {
+            'push_pop_round_trip': 0,
+            'redundant_address_load': 0,
+            'dead_address_load': 0,
+            'jump_to_next_instruction': 0
+        }
+
+    def optimize(self, commands):
+        """
+        returns the optimized list of commands, repeats until nothing else can be removed
+        """
+        commands = list(commands)
+        self._check_jump_targets(commands)
+        self.original_size = self._num_instructions(commands)
+
+        while True:
+            optimized_commands = self._optimize_pass(commands)
+            if len(optimized_commands) == len(commands):
+                break
+            commands = optimized_commands
+
+        self.optimized_size = self._num_instructions(commands)
+        return commands
+
+    def instructions_removed(self):
+        """
+        static number of instructions dropped from the program, not how many cycles a run saves
+        """
+        return self.original_size - self.optimized_size
+
+    def _optimize_pass(self, commands):
+        optimized_commands = []
+        # symbol known to be loaded in A at this point, None when unknown
+        loaded_symbol = None
+        index = 0
+
+        while index < len(commands):
+            command_type, command, symbol = commands[index]
+
+            if command_type == 'label':
+                loaded_symbol = None
+            elif self._push_pop_round_trip_at(commands, index):
+                optimized_commands.extend(self.PUSH_POP_REPLACEMENT)
+                self.removed_instructions['push_pop_round_trip'] += 2
+                # A now holds the old top of stack address, not SP
+                loaded_symbol = None
+                index += len(self.PUSH_POP_ROUND_TRIP)
+                continue
+            elif self._jump_to_next_instruction_at(commands, index):
+                self.removed_instructions['jump_to_next_instruction'] += 2
+                index += 2
+                continue
+            elif command_type == 'address':
+                if symbol == loaded_symbol:
+                    # A already holds this value
+                    self.removed_instructions['redundant_address_load'] += 1
+                    index += 1
+                    continue
+                elif index + 1 < len(commands) and commands[index + 1][0] == 'address':
+                    # overwritten before anything reads it
+                    self.removed_instructions['dead_address_load'] += 1
+                    index += 1
+                    continue
+                loaded_symbol = symbol
+            elif self._writes_a_register(command):
+                loaded_symbol = None
+
+            optimized_commands.append(commands[index])
+            index += 1
+
+        return optimized_commands
+
+    def _check_jump_targets(self, commands):
+        """
+        raises ValueError when a jump may go to a numeric address, e.g. @42 / 0;JMP, it would point elsewhere once optimized
+        """
+        # numeric address possibly loaded in A at this point, labels don't clear it since code can fall through them
+        numeric_address = None
+
+        for command_type, command, symbol in commands:
+            if command_type == 'address':
+                numeric_address = symbol if symbol.isdigit() else None
+            elif command_type == 'computation':
+                if numeric_address is not None and HackAssemblerParser.split_computation(command)[2] is not None:
+                    raise ValueError('can not optimize a jump to ROM address {}, jump to a label instead'.format(numeric_address))
+                if self._writes_a_register(command):
+                    numeric_address = None
+
+    def _push_pop_round_trip_at(self, commands, index):
+        window = commands[index:index + len(self.PUSH_POP_ROUND_TRIP)]
+        return [command for _, command, _ in window] == self.PUSH_POP_ROUND_TRIP
+
+    def _jump_to_next_instruction_at(self, commands, index):
+        """
+        @LABEL / comp;JXX / (LABEL) where the jump has no dest so removing it has no side effects
+        the instruction after the label must load A itself since A won't hold LABEL anymore on fall through
+        """
+        if index + 2 >= len(commands) or commands[index][0] != 'address':
+            return False
+
+        jump_type, jump_command, _ = commands[index + 1]
+        if jump_type != 'computation' or HackAssemblerParser.split_computation(jump_command)[0] is not None:
+            return False
+        if HackAssemblerParser.JUMP_DELIMITER not in jump_command:
+            return False
+
+        target = commands[index][2]
+        labels = []
+        next_index = index + 2
+        while next_index < len(commands) and commands[next_index][0] == 'label':
+            labels.append(commands[next_index][2])
+            next_index += 1
+
+        next_loads_a = next_index == len(commands) or commands[next_index][0] == 'address'
+        return target in labels and next_loads_a
+
+    def _writes_a_register(self, command):
+        dest_mnemonic = HackAssemblerParser.split_computation(command)[0]
+        return dest_mnemonic is not None and 'A' in dest_mnemonic
+
+    def _num_instructions(self, commands):
+        return sum(1 for command_type, _, _ in commands if command_type != 'label')
+
+
+AssemblyResult = collections.namedtuple(
+    'AssemblyResult',
+    [
+        'asm_file_name', 'hack_file_name', 'num_instructions', 'seconds', 'cache_hits', 'cache_misses',
+        'num_instructions_removed', 'error'
+    ]
+)
+
+
+class HackAssemblerDriver():
+    """
+    Assembles many .asm files, optionally across a pool of processes
+    results always come back in the order the files were given so runs are reproducible
+    """
+    ASM_FILE_PATTERN = '*.asm'
+
+    @classmethod
+    def asm_files_in(cls, paths):
+        """
+        expands directories into the .asm files found anywhere beneath them
+        """
+        asm_file_names = []
+
+        for path in paths:
+            if os.path.isdir(path):
+                asm_path = os.path.join(path, '**', cls.ASM_FILE_PATTERN)
+                asm_file_names.extend(sorted(glob.glob(asm_path, recursive=True)))
+            else:
+                asm_file_names.append(path)
+
+        return asm_file_names
+
+    @classmethod
+    def assemble_file(cls, asm_file_name, **options):
+        """
+        assembles a single file, errors are reported in the result instead of raised
+        """
+        cache_before = HackAssemblerDecoder.cache_info()
+        start = time.perf_counter()
+        hack_file_name = None
+        num_instructions = 0
+        num_instructions_removed = 0
+        error = None
+
+        try:
+            assembler = HackAssembler(asm_file_name, **options)
+            assembler.run()
+            hack_file_name = assembler.hack_file_name()
+            num_instructions = len(assembler.machine_codes)
+            if assembler.optimizer:
+                num_instructions_removed = assembler.optimizer.instructions_removed()
+        except Exception as exception:
+            error = '{}: {}'.format(type(exception).__name__, exception)
+
+        cache_after = HackAssemblerDecoder.cache_info()
+
+        return AssemblyResult(
+            asm_file_name=asm_file_name,
+            hack_file_name=hack_file_name,
+            num_instructions=num_instructions,
+            seconds=time.perf_counter() - start,
+            cache_hits=cache_after.hits - cache_before.hits,
+            cache_misses=cache_after.misses - cache_before.misses,
+            num_instructions_removed=num_instructions_removed,
+            error=error
+        )
+
+    @classmethod
+    def assemble_files(cls, asm_file_names, jobs=None, **options):
+        """
+        jobs: number of worker processes, None for one per cpu, 1 to assemble in this process
+        """
+        assemble_file = functools.partial(cls.assemble_file, **options)
+
+        if jobs == 1 or len(asm_file_names) <= 1:
+            return list(map(assemble_file, asm_file_names))
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(assemble_file, asm_file_names))
+
+    @classmethod
+    def summary(cls, results, seconds):
+        lines = []
+
+        for result in results:
+            if result.error:
+                lines.append('FAIL {} ({})'.format(result.asm_file_name, result.error))
+            else:
+                lines.append('ok   {} -> {} ({} instructions, {:.3f}s)'.format(
+                    result.asm_file_name, result.hack_file_name, result.num_instructions, result.seconds
+                ))
+                if result.num_instructions_removed:
+                    lines.append('     rom {} -> {} words, {} instructions removed'.format(
+                        result.num_instructions + result.num_instructions_removed,
+                        result.num_instructions,
+                        result.num_instructions_removed
+                    ))
+            if result.num_instructions > HackPeepholeOptimizer.ROM_SIZE:
+                lines.append('     WARNING: {} instructions exceed the {} word ROM'.format(
+                    result.num_instructions, HackPeepholeOptimizer.ROM_SIZE
+                ))
+
+        num_failed = sum(1 for result in results if result.error)
+        lines.append('{} files assembled, {} failed, {} instructions in {:.3f}s'.format(
+            len(results) - num_failed, num_failed, sum(result.num_instructions for result in results), seconds
+        ))
+
+        return '\n'.join(lines)
+
+
+def main(argv):
+    """
+    exit codes: 0 everything assembled, 1 at least one file failed, 2 no .asm files found
+    """
+    argument_parser = argparse.ArgumentParser(description='Hack assembler: translates .asm files into .hack machine code')
+    argument_parser.add_argument('paths', nargs='+', help='.asm files or directories containing .asm files')
+    argument_parser.add_argument('--single-pass', action='store_true', help='read each file once and back-patch labels')
+    argument_parser.add_argument('--bulk', action='store_true', help='read and decode each file all at once')
+    argument_parser.add_argument('--binary', action='store_true', help='write packed binary .bin rom images')
+    argument_parser.add_argument('--optimize', '-O', action='store_true', help='run the peephole optimizer before encoding')
+    argument_parser.add_argument('--jobs', '-j', type=int, default=None, help='worker processes, defaults to cpu count')
+    argument_parser.add_argument('--cache-stats', action='store_true', help='report computation cache hits / misses')
+    arguments = argument_parser.parse_args(argv)
+
+    asm_file_names = HackAssemblerDriver.asm_files_in(arguments.paths)
+    if not asm_file_names:
+        print('no .asm files found', file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    results = HackAssemblerDriver.assemble_files(
+        asm_file_names,
+        jobs=arguments.jobs,
+        single_pass=arguments.single_pass,
+        bulk=arguments.bulk,
+        optimize=arguments.optimize,
+        output_format=HackRomFile.BINARY_FORMAT if arguments.binary else HackRomFile.TEXT_FORMAT
+    )
+    print(HackAssemblerDriver.summary(results, seconds=time.perf_counter() - start))
+
+    if arguments.cache_stats:
+        print('computation cache: {} hits, {} misses'.format(
+            sum(result.cache_hits for result in results), sum(result.cache_misses for result in results)
+        ))
+
+    return 1 if any(result.error for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
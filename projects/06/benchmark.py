@@ -0,0 +1,332 @@
+"""
+Benchmarks for the Hack assembler
+
+usage:
+    python3 benchmark.py parsers [--lines N]
+        lines per second of the line by line parser vs the bulk parser on a synthetic .asm file (default 1M lines)
+    python3 benchmark.py suite [--output results.json] [--compare baseline.json] [--repeat N]
+        wall time, peak memory and instructions per second of each assembler phase on synthetic programs
+        and the sample programs in this project, results stored as JSON to track regressions between versions
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+
+from HackAssembler import HackAssembler, HackAssemblerParser, HackAssemblerBulkParser
+
+PROJECT_DIR = os.path.dirname(os.path.realpath(__file__))
+SAMPLE_PROGRAMS = ['add/Add.asm', 'max/Max.asm', 'rect/Rect.asm', 'pong/Pong.asm', 'pong/PongL.asm']
+ROM_SIZE = 32768
+
+
+def synthetic_asm_lines(num_lines):
+    """
+    mix of instructions, labels, comments and blank lines resembling VM translated output
+    """
+    pattern = [
+        '// push constant {i}',
+        '@{i}',
+        'D=A',
+        '@SP',
+        'A=M',
+        'M=D',
+        '@SP',
+        'M=M+1',
+        '(LOOP_{i})',
+        '@var_{v}',
+        'D=M // load variable',
+        '@LOOP_{i}',
+        'D;JGT',
+        '',
+        '    AM=M-1',
+        '0;JMP'
+    ]
+
+    for i in range(num_lines):
+        yield pattern[i % len(pattern)].format(i=i // len(pattern), v=i % 97)
+
+
+def many_labels_asm_lines(num_instructions):
+    """
+    a label every four instructions, half of the jumps go forward to labels not defined yet
+    """
+    num_labels = num_instructions // 4
+    for i in range(num_labels):
+        yield '(L{})'.format(i)
+        yield '@L{}'.format(min(i + num_labels // 2, num_labels - 1) if i % 2 else i)
+        yield 'D;JGT'
+        yield '@L{}'.format(i)
+        yield '0;JEQ'
+
+
+def many_variables_asm_lines(num_instructions):
+    """
+    every A-instruction references a different variable
+    """
+    for i in range(num_instructions // 2):
+        yield '@var{}'.format(i)
+        yield 'M=D'
+
+
+def straight_line_asm_lines(num_instructions):
+    """
+    long run of predefined symbols and computations without any labels or variables
+    """
+    computations = ['D=M', 'M=D', 'AM=M-1', 'M=M+1', 'D=D+A', 'A=M', 'D=D-M', 'M=-1']
+    for i in range(num_instructions // 2):
+        yield '@R{}'.format(i % 16)
+        yield computations[i % len(computations)]
+
+
+def full_rom_asm_lines(num_instructions=ROM_SIZE):
+    """
+    program filling the whole ROM, VM translator style push / pop / call sequences
+    """
+    lines = list(synthetic_asm_lines(num_instructions * 2))
+    num_written = 0
+    for line in lines:
+        command = line.partition('//')[0].strip()
+        if command and not command.startswith('('):
+            if num_written == num_instructions:
+                break
+            num_written += 1
+        yield line
+
+
+SYNTHETIC_PROGRAMS = {
+    'many_labels': lambda: many_labels_asm_lines(20000),
+    'many_variables': lambda: many_variables_asm_lines(20000),
+    'straight_line': lambda: straight_line_asm_lines(200000),
+    'full_rom': lambda: full_rom_asm_lines(ROM_SIZE)
+}
+
+
+def write_asm_file(lines, asm_file_name=None):
+    if asm_file_name is None:
+        asm_file = tempfile.NamedTemporaryFile(mode='w', suffix='.asm', delete=False)
+    else:
+        asm_file = open(asm_file_name, 'w')
+
+    with asm_file:
+        for line in lines:
+            asm_file.write(line + '\n')
+
+    return asm_file.name
+
+
+def write_synthetic_asm_file(num_lines):
+    return write_asm_file(synthetic_asm_lines(num_lines))
+
+
+def parse_all(parser):
+    """
+    steps through every line the way the assembler does
+    """
+    while parser.has_more_lines_to_parse:
+        parser.advance()
+
+        if parser.current_command_type == 'address' or parser.current_command_type == 'label':
+            parser.symbol()
+        elif parser.current_command_type == 'computation':
+            parser.dest_mnemonic()
+            parser.comp_mnemonic()
+            parser.jump_mnemonic()
+
+
+def benchmark_parser(parser_class, asm_file_name, num_lines):
+    start = time.perf_counter()
+    parser = parser_class(asm_file_name)
+    parse_all(parser)
+    elapsed = time.perf_counter() - start
+    parser.input_file.close()
+
+    return num_lines / elapsed, elapsed
+
+
+def run_phases(asm_file_name):
+    """
+    runs the two pass assembler on the bulk parser one phase at a time
+    returns {phase: seconds} and the number of instructions
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    assembler = HackAssembler(asm_file_name, bulk=True)
+    timings['parse'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    assembler.parse_for_labels()
+    timings['first_pass'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    assembler.parser.reset()
+    assembler.translate()
+    timings['second_pass'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    assembler.write_hack_file()
+    timings['write'] = time.perf_counter() - start
+    assembler.parser.input_file.close()
+
+    for name, options in [('line_two_pass', {}), ('line_single_pass', {'single_pass': True}), ('bulk_single_pass', {'single_pass': True, 'bulk': True})]:
+        start = time.perf_counter()
+        HackAssembler(asm_file_name, **options).run()
+        timings[name] = time.perf_counter() - start
+
+    return timings, len(assembler.machine_codes)
+
+
+def peak_memory_of_phases(asm_file_name):
+    """
+    separate run under tracemalloc so its overhead doesn't skew the timings
+    """
+    peaks = {}
+    tracemalloc.start()
+
+    assembler = HackAssembler(asm_file_name, bulk=True)
+    peaks['parse'] = tracemalloc.get_traced_memory()[1]
+
+    for phase, run_phase in [
+        ('first_pass', assembler.parse_for_labels),
+        ('second_pass', lambda: (assembler.parser.reset(), assembler.translate())),
+        ('write', assembler.write_hack_file)
+    ]:
+        tracemalloc.reset_peak()
+        run_phase()
+        peaks[phase] = tracemalloc.get_traced_memory()[1]
+
+    tracemalloc.stop()
+    assembler.parser.input_file.close()
+    return peaks
+
+
+def benchmark_program(name, asm_file_name, repeat):
+    # best of repeat runs per phase
+    runs = [run_phases(asm_file_name) for _ in range(repeat)]
+    num_instructions = runs[0][1]
+    timings = {phase: min(timings[phase] for timings, _ in runs) for phase in runs[0][0]}
+    peaks = peak_memory_of_phases(asm_file_name)
+    with open(asm_file_name) as asm_file:
+        num_lines = sum(1 for _ in asm_file)
+
+    phases = {}
+    for phase, seconds in timings.items():
+        phases[phase] = {
+            'seconds': seconds,
+            'instructions_per_second': num_instructions / seconds if seconds else None,
+            'peak_memory_bytes': peaks.get(phase)
+        }
+
+    return {
+        'name': name,
+        'num_lines': num_lines,
+        'num_instructions': num_instructions,
+        'phases': phases
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(repeat):
+    work_dir = tempfile.mkdtemp()
+    programs = []
+
+    try:
+        for name, lines in SYNTHETIC_PROGRAMS.items():
+            asm_file_name = write_asm_file(lines(), os.path.join(work_dir, name + '.asm'))
+            programs.append(benchmark_program(name, asm_file_name, repeat))
+
+        for sample_program in SAMPLE_PROGRAMS:
+            # copy so the .hack files in the repo are left alone
+            asm_file_name = os.path.join(work_dir, os.path.basename(sample_program))
+            shutil.copy(os.path.join(PROJECT_DIR, sample_program), asm_file_name)
+            programs.append(benchmark_program(os.path.basename(sample_program), asm_file_name, repeat))
+    finally:
+        shutil.rmtree(work_dir)
+
+    return {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'programs': programs
+    }
+
+
+def report(results, baseline=None):
+    baseline_programs = {program['name']: program for program in (baseline or {}).get('programs', [])}
+    lines = ['{:<16} {:<17} {:>9} {:>14} {:>10} {:>9}'.format(
+        'program', 'phase', 'seconds', 'instructions/s', 'peak KiB', 'change'
+    )]
+
+    for program in results['programs']:
+        for phase, measurement in program['phases'].items():
+            change = ''
+            baseline_phase = baseline_programs.get(program['name'], {}).get('phases', {}).get(phase)
+            if baseline_phase and baseline_phase['seconds']:
+                change = '{:+.1%}'.format(measurement['seconds'] / baseline_phase['seconds'] - 1)
+
+            peak_memory = measurement['peak_memory_bytes']
+            lines.append('{:<16} {:<17} {:>9.4f} {:>14,.0f} {:>10} {:>9}'.format(
+                program['name'],
+                phase,
+                measurement['seconds'],
+                measurement['instructions_per_second'] or 0,
+                '{:,.0f}'.format(peak_memory / 1024) if peak_memory is not None else '-',
+                change
+            ))
+
+    return '\n'.join(lines)
+
+
+def main(argv):
+    argument_parser = argparse.ArgumentParser(description='Hack assembler benchmarks')
+    subparsers = argument_parser.add_subparsers(dest='benchmark')
+    parsers_parser = subparsers.add_parser('parsers', help='line by line vs bulk parser throughput')
+    parsers_parser.add_argument('--lines', type=int, default=1000000)
+    suite_parser = subparsers.add_parser('suite', help='per phase time / memory on synthetic and sample programs')
+    suite_parser.add_argument('--output', help='write results as JSON to this file')
+    suite_parser.add_argument('--compare', help='JSON results of a previous run to compare against')
+    suite_parser.add_argument('--repeat', type=int, default=3, help='runs per program, best time is kept')
+    arguments = argument_parser.parse_args(argv)
+
+    if arguments.benchmark == 'suite':
+        results = run_suite(arguments.repeat)
+        baseline = None
+        if arguments.compare:
+            with open(arguments.compare) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        print(report(results, baseline))
+        if arguments.output:
+            with open(arguments.output, 'w') as output_file:
+                json.dump(results, output_file, indent=2)
+    else:
+        num_lines = getattr(arguments, 'lines', 1000000)
+        asm_file_name = write_synthetic_asm_file(num_lines)
+
+        try:
+            for parser_class in [HackAssemblerParser, HackAssemblerBulkParser]:
+                lines_per_second, elapsed = benchmark_parser(parser_class, asm_file_name, num_lines)
+                print('{:<24} {:>12,.0f} lines/sec {:>8.2f}s'.format(parser_class.__name__, lines_per_second, elapsed))
+        finally:
+            os.remove(asm_file_name)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
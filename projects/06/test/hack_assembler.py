@@ -0,0 +1,213 @@
+import unittest
+import shutil
+import tempfile
+
+# add source files to path
+import os, sys
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.append(PROJECT_DIR)
+
+from HackAssembler import HackAssembler, HackAssemblerBulkParser, HackAssemblerDriver, HackPeepholeOptimizer, HackRomFile, SymbolTable
+
+class TestHackAssembler(unittest.TestCase):
+    ASM_FILES = [
+        'add/Add.asm',
+        'max/Max.asm',
+        'rect/Rect.asm',
+        'pong/Pong.asm'
+    ]
+
+    def setUp(self):
+        # assemble copies so the .hack files in the repo are left alone
+        self.output_dir = tempfile.mkdtemp()
+        self.asm_file_names = []
+        for asm_file in self.ASM_FILES:
+            asm_file_name = os.path.join(self.output_dir, os.path.basename(asm_file))
+            shutil.copy(os.path.join(PROJECT_DIR, asm_file), asm_file_name)
+            self.asm_file_names.append(asm_file_name)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def assemble(self, asm_file_name, **options):
+        assembler = HackAssembler(asm_file_name, **options)
+        assembler.run()
+        return assembler
+
+    def test_run(self):
+        ## IT MATCHES THE REFERENCE MACHINE CODE
+        for asm_file in self.ASM_FILES:
+            asm_file_name = os.path.join(self.output_dir, os.path.basename(asm_file))
+            assembler = self.assemble(asm_file_name)
+
+            expected = HackRomFile.read_text(os.path.join(PROJECT_DIR, asm_file.replace('.asm', '.hack')))
+            self.assertEqual(assembler.machine_codes, expected)
+
+    def test_single_pass_and_bulk(self):
+        ## IT PRODUCES THE SAME OUTPUT AS THE TWO PASS TRANSLATION
+        for asm_file_name in self.asm_file_names:
+            expected = self.assemble(asm_file_name).machine_codes
+
+            for options in [{'single_pass': True}, {'bulk': True}, {'single_pass': True, 'bulk': True}]:
+                self.assertEqual(self.assemble(asm_file_name, **options).machine_codes, expected)
+
+    def test_binary_round_trip(self):
+        ## IT READS BACK WHAT IT WROTE IN BOTH FORMATS
+        for asm_file_name in self.asm_file_names:
+            assembler = self.assemble(asm_file_name, output_format=HackRomFile.BINARY_FORMAT)
+            rom = HackRomFile.load_binary(assembler.hack_file_name())
+
+            self.assertTrue(assembler.hack_file_name().endswith('.bin'))
+            self.assertEqual(os.path.getsize(assembler.hack_file_name()), 2 * len(assembler.machine_codes))
+            self.assertEqual(rom.tolist(), assembler.machine_codes.tolist())
+
+            text_file_name = os.path.join(self.output_dir, 'round_trip.hack')
+            HackRomFile.write_text(text_file_name, rom)
+            self.assertEqual(HackRomFile.read_text(text_file_name), assembler.machine_codes)
+            rom.release()
+
+    def test_assemble_lines(self):
+        ## IT ASSEMBLES LINES IN MEMORY THE SAME WAY AS FILES
+        for asm_file_name in self.asm_file_names:
+            expected = self.assemble(asm_file_name).machine_codes
+
+            with open(asm_file_name) as asm_file:
+                self.assertEqual(list(HackAssembler.assemble_lines(asm_file)), expected.tolist())
+
+            with open(asm_file_name) as asm_file:
+                lines = (line for line in asm_file.read().splitlines())
+                self.assertEqual(list(HackAssembler.assemble_lines(lines)), expected.tolist())
+
+    def test_assemble_lines_is_lazy(self):
+        ## IT YIELDS WORDS BEFORE THE INPUT IS EXHAUSTED AND HOLDS BACK ONLY UNRESOLVED ONES
+        lines_read = []
+        def lines():
+            for line in ['@2', 'D=A', '@END', '0;JMP', '@3', '(END)', '@x', 'M=D', '@END']:
+                lines_read.append(line)
+                yield line
+
+        machine_codes = HackAssembler.assemble_lines(lines())
+        self.assertEqual(next(machine_codes), 2)
+        self.assertEqual(lines_read, ['@2'])
+        next(machine_codes)
+        # @END is waiting on its label so everything up to (END) has to be read
+        self.assertEqual(next(machine_codes), 5)
+        self.assertEqual(lines_read[-1], '(END)')
+        self.assertEqual(list(machine_codes), [0b1110101010000111, 3, 16, 0b1110001100001000, 5])
+
+class TestSymbolTable(unittest.TestCase):
+    def test_add_entry(self):
+        ## IT MAPS A LABEL TO ADDRESS 0 INSTEAD OF ALLOCATING A VARIABLE
+        symbol_table = SymbolTable()
+        self.assertEqual(symbol_table.add_entry(symbol='START', address=0), 0)
+        self.assertEqual(symbol_table.add_entry(symbol='counter'), 16)
+        self.assertEqual(symbol_table.get_address('SCREEN'), 16384)
+
+    def test_tables_are_independent(self):
+        ## IT NEVER WRITES INTO THE SHARED PREDEFINED SYMBOLS
+        first_table = SymbolTable()
+        first_table.add_entry(symbol='LOOP', address=4)
+        first_table.add_entry(symbol='R0', address=10)
+
+        second_table = SymbolTable()
+        self.assertFalse(second_table.contains('LOOP'))
+        self.assertEqual(second_table.get_address('R0'), 0)
+        self.assertNotIn('LOOP', SymbolTable.PREDEFINED_SYMBOLS)
+        with self.assertRaises(TypeError):
+            SymbolTable.PREDEFINED_SYMBOLS['LOOP'] = 4
+
+class TestHackPeepholeOptimizer(unittest.TestCase):
+    def optimize(self, lines):
+        self.optimizer = HackPeepholeOptimizer()
+        commands = self.optimizer.optimize(HackAssemblerBulkParser.iter_commands(lines))
+        return [command for _, command, _ in commands]
+
+    def test_push_pop_round_trip(self):
+        ## IT REPLACES A PUSH IMMEDIATELY POPPED AGAIN WITH A LOAD OF THE OLD TOP OF STACK
+        lines = ['@SP', 'A=M', 'M=D', '@SP', 'M=M+1', '@SP', 'AM=M-1', 'D=M']
+        self.assertEqual(self.optimize(lines), ['@SP', 'A=M', 'M=D', '@SP', 'A=M', 'D=M'])
+        self.assertEqual(self.optimizer.removed_instructions['push_pop_round_trip'], 2)
+
+    def test_address_loads(self):
+        ## IT DROPS RELOADS OF THE SAME ADDRESS AND LOADS OVERWRITTEN RIGHT AWAY
+        lines = ['@SP', 'M=M+1', '@SP', 'D=M', '@5', '@6', 'D=A']
+        self.assertEqual(self.optimize(lines), ['@SP', 'M=M+1', 'D=M', '@6', 'D=A'])
+        self.assertEqual(self.optimizer.instructions_removed(), 2)
+
+    def test_address_loads_across_labels(self):
+        ## IT KEEPS LOADS AFTER LABELS AND AFTER A IS WRITTEN
+        lines = ['@SP', 'M=M+1', '(LOOP)', '@SP', 'A=M', '@SP', 'M=0']
+        self.assertEqual(self.optimize(lines), ['@SP', 'M=M+1', '(LOOP)', '@SP', 'A=M', '@SP', 'M=0'])
+
+    def test_jump_to_next_instruction(self):
+        ## IT DROPS JUMPS TO THE INSTRUCTION RIGHT AFTER THEM
+        lines = ['@END', '0;JMP', '(END)', '@END', 'D;JGT', '(NEXT)', 'D=M', '@NEXT', 'D;JEQ', '(END2)']
+        self.assertEqual(self.optimize(lines), ['(END)', '@END', 'D;JGT', '(NEXT)', 'D=M', '@NEXT', 'D;JEQ', '(END2)'])
+
+    def test_numeric_jump_targets(self):
+        ## IT REJECTS JUMPS TO NUMERIC ADDRESSES SINCE REMOVING INSTRUCTIONS WOULD MOVE THEIR TARGET
+        for lines in [['@SP', '@SP', '@42', '0;JMP'], ['@7', 'D=M', 'D;JGT']]:
+            with self.assertRaises(ValueError):
+                self.optimize(lines)
+
+        ## IT ACCEPTS NUMERIC ADDRESSES USED AS DATA
+        self.assertEqual(self.optimize(['@42', 'D=A', '@LOOP', 'D;JGT', '@7', 'A=M', '0;JMP']),
+                         ['@42', 'D=A', '@LOOP', 'D;JGT', '@7', 'A=M', '0;JMP'])
+
+    def test_assembler(self):
+        ## IT RESOLVES LABELS AGAINST THE OPTIMIZED PROGRAM
+        output_dir = tempfile.mkdtemp()
+        try:
+            asm_file_name = os.path.join(output_dir, 'Optimize.asm')
+            with open(asm_file_name, 'w') as asm_file:
+                asm_file.write('@SP\nM=M+1\n@SP\nAM=M-1\n@LOOP\n0;JMP\n(LOOP)\n@LOOP\n0;JMP\n')
+
+            assembler = HackAssembler(asm_file_name, optimize=True)
+            assembler.run()
+        finally:
+            shutil.rmtree(output_dir)
+
+        self.assertEqual(assembler.machine_codes.tolist(), [0, 0b1111110000100000, 2, 0b1110101010000111])
+
+class TestHackAssemblerDriver(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        for asm_file in ['add/Add.asm', 'max/Max.asm', 'rect/Rect.asm']:
+            shutil.copy(os.path.join(PROJECT_DIR, asm_file), self.output_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_assemble_files(self):
+        ## IT ASSEMBLES EVERY FILE IN A DIRECTORY IN A STABLE ORDER
+        asm_file_names = HackAssemblerDriver.asm_files_in([self.output_dir])
+        results = HackAssemblerDriver.assemble_files(asm_file_names, jobs=2)
+
+        self.assertEqual([os.path.basename(result.asm_file_name) for result in results], ['Add.asm', 'Max.asm', 'Rect.asm'])
+        self.assertEqual([result.num_instructions for result in results], [6, 16, 25])
+        self.assertTrue(all(result.error is None for result in results))
+        self.assertTrue(all(os.path.exists(result.hack_file_name) for result in results))
+
+    def test_assemble_files_in_process(self):
+        ## IT DOES NOT LEAK SYMBOLS BETWEEN FILES ASSEMBLED IN THE SAME PROCESS
+        # OUTPUT_FIRST is a label in Max.asm but a variable here
+        variables_file_name = os.path.join(self.output_dir, 'Variables.asm')
+        with open(variables_file_name, 'w') as variables_file:
+            variables_file.write('@OUTPUT_FIRST\nM=1\n@x\nM=0\n')
+
+        max_file_name = os.path.join(self.output_dir, 'Max.asm')
+        results = HackAssemblerDriver.assemble_files([max_file_name, variables_file_name], jobs=1)
+
+        self.assertEqual(HackRomFile.read_text(results[1].hack_file_name)[0::2].tolist(), [16, 17])
+
+    def test_assemble_files_with_errors(self):
+        ## IT REPORTS FAILURES WITHOUT STOPPING THE BATCH
+        missing_file_name = os.path.join(self.output_dir, 'Missing.asm')
+        add_file_name = os.path.join(self.output_dir, 'Add.asm')
+        results = HackAssemblerDriver.assemble_files([missing_file_name, add_file_name], jobs=1)
+
+        self.assertIsNotNone(results[0].error)
+        self.assertIsNone(results[1].error)
+
+if __name__ == '__main__':
+    unittest.main()
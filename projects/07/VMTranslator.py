@@ -81,16 +81,42 @@ class VMParser():
 
 class VMWriter():
     """
-    simply wrapper for interacting with output file
+    buffers assembly instructions and writes them out joined in large chunks
+    output: open text stream to write to instead of the .asm file next to input_file, i.e., sys.stdout, left open
     """
-    def __init__(self, input_file):
-        self.output_file = open(self._output_file_name_from(input_file), 'w')
+    CHUNK_SIZE = 16384  # instructions per write
+
+    def __init__(self, input_file, output=None):
+        if output is None:
+            self.output_file = open(self._output_file_name_from(input_file), 'w')
+        else:
+            self.output_file = output
+
+        self.owns_output_file = output is None
+        self.buffer = []
 
     def write(self, command):
-        self.output_file.write(command)
+        self.buffer.append(command)
+        if len(self.buffer) >= self.CHUNK_SIZE:
+            self.flush()
+
+    def write_instructions(self, instructions):
+        self.buffer.extend(instructions)
+        if len(self.buffer) >= self.CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.output_file.write('\n'.join(self.buffer))
+            self.output_file.write('\n')
+            self.buffer.clear()
+
+        self.output_file.flush()
 
     def close_file(self):
-        self.output_file.close()
+        self.flush()
+        if self.owns_output_file:
+            self.output_file.close()
 
     def _output_file_name_from(self, input_file):
         return input_file.split('.')[0] + '.asm'
@@ -356,11 +382,17 @@ class VMPushPopTranslator():
         ]
 
 
-if __name__ == "__main__" and len(sys.argv) == 2:
+if __name__ == "__main__":
+    # python VMTranslator.py Foo.vm --stdout writes the assembly to stdout instead of Foo.asm
+    if len(sys.argv) < 2 or sys.argv[2:] not in ([], ['--stdout']):
+        print('usage: python VMTranslator.py Foo.vm [--stdout]', file=sys.stderr)
+        sys.exit(2)
+
     vm_code_file = sys.argv[1]
+    output = sys.stdout if sys.argv[2:] == ['--stdout'] else None
 
     parser = VMParser(vm_code_file)
-    writer = VMWriter(vm_code_file)
+    writer = VMWriter(vm_code_file, output=output)
     arithmetic_translator = VMArithmeticTranslator()
     push_pop_translator = VMPushPopTranslator()
 
@@ -374,7 +406,6 @@ if __name__ == "__main__" and len(sys.argv) == 2:
             else:
                 translation = arithmetic_translator.translate(parser.current_command)
 
-            for line in translation:
-                writer.write(line + '\n')
+            writer.write_instructions(translation)
 
     writer.close_file()
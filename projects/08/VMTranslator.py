@@ -2,87 +2,158 @@ import sys
 import os
 import re
 import glob
+import argparse
+import functools
+import concurrent.futures
 
 class VMCommand():
     """
     provides simpler interface and encapsulation for inspecting current command
+    the line is parsed once on creation into an integer opcode and its arguments
     """
+    __slots__ = ('raw_text', 'opcode', 'translation_key', '_text', '_parts')
+
     COMMENT_SYMBOL = '//'
     NEWLINE_SYMBOL = '\n'
     EMPTY_SYMBOL = ''
-    COMPARISON_OPERATIONS = [ 'eq', 'lt', 'gt' ]
-    ARITHMETIC_BINARY_OPERATIONS = [ 'add', 'sub', 'and', 'or' ]
-    ARITHMETIC_UNARY_OPERATIONS = [ 'neg', 'not' ]
+
+    # opcodes
+    PUSH, POP, ADD, SUB, NEG, EQ, GT, LT, AND, OR, NOT, LABEL, GOTO, IF_GOTO, FUNCTION, CALL, RETURN = range(17)
+    # only produced by VMOptimizer
+    MOVE, COMPARE_GOTO = 17, 18
+    OPCODES = {
+        'push': PUSH,
+        'pop': POP,
+        'add': ADD,
+        'sub': SUB,
+        'neg': NEG,
+        'eq': EQ,
+        'gt': GT,
+        'lt': LT,
+        'and': AND,
+        'or': OR,
+        'not': NOT,
+        'label': LABEL,
+        'goto': GOTO,
+        'if-goto': IF_GOTO,
+        'function': FUNCTION,
+        'call': CALL,
+        'return': RETURN,
+        'move': MOVE,
+        'compare-goto': COMPARE_GOTO
+    }
+    COMPARISON_OPERATIONS = frozenset([ EQ, LT, GT ])
+    ARITHMETIC_BINARY_OPERATIONS = frozenset([ ADD, SUB, AND, OR ])
+    ARITHMETIC_UNARY_OPERATIONS = frozenset([ NEG, NOT ])
+    BRANCHING_OPERATIONS = frozenset([ LABEL, GOTO, IF_GOTO ])
+    MEMORY_ACCESS_OPERATIONS = frozenset([ PUSH, POP ])
 
     def __init__(self, raw_text):
         self.raw_text = raw_text
+        self._text = raw_text.split(self.COMMENT_SYMBOL, 1)[0].strip()
+        self._parts = self._text.split()
+
+        if not self._parts:
+            # whitespace, comment or end of file
+            self.opcode = None
+            self.translation_key = None
+        elif self._parts[0] in self.OPCODES:
+            self.opcode = self.OPCODES[self._parts[0]]
+            # (operation, segment) for push / pop, (operation, None) for everything else
+            if self.opcode in self.MEMORY_ACCESS_OPERATIONS:
+                self.translation_key = (self._parts[0], self._parts[1])
+            else:
+                self.translation_key = (self._parts[0], None)
+        else:
+            raise ValueError('unknown VM command: {}'.format(self._text))
+
+    @classmethod
+    def register_operation(cls, operation):
+        """
+        makes a new operation known to the parser, returns its opcode
+        """
+        if operation not in cls.OPCODES:
+            cls.OPCODES[operation] = len(cls.OPCODES)
+
+        return cls.OPCODES[operation]
 
     def text(self):
-        return self.raw_text.split(self.COMMENT_SYMBOL)[0].strip()
+        return self._text
 
     def parts(self):
-        return self.text().split(' ')
+        return self._parts
 
     def label(self):
-        if self.is_branching_command():
-            return self.parts()[1]
+        if self.opcode in self.BRANCHING_OPERATIONS:
+            return self._parts[1]
 
     def function_name(self):
-        if self.is_function_definition_command() or self.is_function_call_command():
-            return self.parts()[1]
+        if self.opcode == self.FUNCTION or self.opcode == self.CALL:
+            return self._parts[1]
 
     def num_arguments(self):
-        if self.is_function_call_command():
-            return self.parts()[2]
+        if self.opcode == self.CALL:
+            return self._parts[2]
+
+    def move_commands(self):
+        """
+        move source_segment source_index target_segment target_index as its push and pop
+        """
+        if self.opcode == self.MOVE:
+            _, source_segment, source_index, target_segment, target_index = self._parts
+            return (
+                VMCommand('push {} {}'.format(source_segment, source_index)),
+                VMCommand('pop {} {}'.format(target_segment, target_index))
+            )
 
     def locals(self):
-        if self.is_function_definition_command():
-            return self.parts()[2]
+        if self.opcode == self.FUNCTION:
+            return self._parts[2]
 
     def for_static_memory_segment(self):
         if self.memory_access_command():
-            return self.segment() == 'static'
+            return self._parts[1] == 'static'
 
     def segment(self):
         if self.memory_access_command():
-            return self.parts()[1]
+            return self._parts[1]
 
     def index(self):
         if self.memory_access_command():
-            return self.parts()[2]
+            return self._parts[2]
 
     def is_function_command(self):
-        return self.is_function_definition_command() or self.is_call_command() or self.is_return_command()
+        return self.opcode == self.FUNCTION or self.opcode == self.CALL or self.opcode == self.RETURN
 
     def is_function_definition_command(self):
-        return self.operation() == 'function'
+        return self.opcode == self.FUNCTION
 
     def is_function_call_command(self):
-        return self.operation() == 'call'
+        return self.opcode == self.CALL
 
     def is_return_command(self):
-        return self.operation() == 'return'
+        return self.opcode == self.RETURN
 
     def is_branching_command(self):
-        return self.is_goto_command() or self.is_label_command() or self.is_ifgoto_command()
+        return self.opcode in self.BRANCHING_OPERATIONS
 
     def is_goto_command(self):
-        return self.operation() == 'goto'
+        return self.opcode == self.GOTO
 
     def is_ifgoto_command(self):
-        return self.operation() == 'if-goto'
+        return self.opcode == self.IF_GOTO
 
     def is_label_command(self):
-        return self.operation() == 'label'
+        return self.opcode == self.LABEL
 
     def is_push_or_pop_command(self):
-        return self.is_push_command() or self.is_pop_command()
+        return self.opcode == self.PUSH or self.opcode == self.POP
 
     def is_push_command(self):
-        return self.operation() == 'push'
+        return self.opcode == self.PUSH
 
     def is_pop_command(self):
-        return self.operation() == 'pop'
+        return self.opcode == self.POP
 
     def is_comment(self):
         return self.raw_text[0:2] == self.COMMENT_SYMBOL
@@ -94,22 +165,23 @@ class VMCommand():
         return self.raw_text == self.EMPTY_SYMBOL
 
     def operation(self):
-        return self.parts()[0]
+        return self._parts[0]
 
     def memory_access_command(self):
-        return len(self.parts()) == 3
+        # function and call have three parts as well
+        return self.opcode in self.MEMORY_ACCESS_OPERATIONS
 
     def is_logical_command(self):
         return self.is_comparison_command() or self.is_arithmetic_binary_command() or self.is_arithmetic_unary_command()
 
     def is_comparison_command(self):
-        return self.operation() in self.COMPARISON_OPERATIONS
+        return self.opcode in self.COMPARISON_OPERATIONS
 
     def is_arithmetic_binary_command(self):
-        return self.operation() in self.ARITHMETIC_BINARY_OPERATIONS
+        return self.opcode in self.ARITHMETIC_BINARY_OPERATIONS
 
     def is_arithmetic_unary_command(self):
-        return self.operation() in self.ARITHMETIC_UNARY_OPERATIONS
+        return self.opcode in self.ARITHMETIC_UNARY_OPERATIONS
 
 class VMParser():
     """
@@ -124,7 +196,8 @@ class VMParser():
         self.next_command = None
 
     def has_invalid_current_command(self):
-        return self.current_command.is_whitespace() or self.current_command.is_comment()
+        # whitespace, comments and end of file have no opcode
+        return self.current_command.opcode is None
 
     def advance(self):
         self._update_current_command()
@@ -147,18 +220,248 @@ class VMParser():
         else:
             self.current_command = self.next_command
 
+class VMOptimizer():
+    """
+    VM to VM optimization pass over the parsed commands of a file, runs before the translators
+    every appended command is matched against the tail of the already optimized commands so folded
+    results take part in the next fold, i.e., push constant 1; push constant 2; add; neg -> push constant 3; neg
+    rewrites into the operations move and compare-goto, which are registered with Main like any other
+    """
+    MAX_CONSTANT = 32767
+    NEGATED_CONDITIONS = {
+        'eq': 'ne',
+        'ne': 'eq',
+        'lt': 'ge',
+        'ge': 'lt',
+        'gt': 'le',
+        'le': 'gt'
+    }
+
+    def __init__(self):
+        self.original_size = 0
+        self.optimized_size = 0
+        # rule -> number of times applied
+        self.rewrites = {
+            'constant_folding': 0,
+            'algebraic_identity': 0,
+            'double_negation': 0,
+            'move': 0,
+            'constant_branch': 0,
+            'compare_goto': 0
+        }
+
+    def optimize(self, commands):
+        optimized = []
+
+        for command in commands:
+            if command.opcode is None:
+                continue
+
+            self.original_size += 1
+            if not self._rewrite(optimized, command):
+                optimized.append(command)
+
+        self.optimized_size += len(optimized)
+        return optimized
+
+    def _rewrite(self, optimized, command):
+        """
+        applies the first rule matching command appended to optimized, False if none did
+        """
+        opcode = command.opcode
+
+        if opcode in VMCommand.ARITHMETIC_UNARY_OPERATIONS:
+            return self._fold_unary(optimized, command)
+        elif opcode in VMCommand.ARITHMETIC_BINARY_OPERATIONS or opcode in VMCommand.COMPARISON_OPERATIONS:
+            return self._fold_binary(optimized, command)
+        elif opcode == VMCommand.POP:
+            return self._push_pop_to_move(optimized, command)
+        elif opcode == VMCommand.IF_GOTO:
+            return self._simplify_ifgoto(optimized, command)
+
+        return False
+
+    def _fold_unary(self, optimized, command):
+        if optimized and optimized[-1].opcode == command.opcode:
+            # ~~x = x, --x = x
+            optimized.pop()
+            self.rewrites['double_negation'] += 1
+            return True
+
+        constant = self._constant_at(optimized, len(optimized))
+        if constant is None:
+            return False
+
+        value, length = constant
+        value = -value if command.opcode == VMCommand.NEG else ~value
+        return self._replace_with_constant(optimized, length, value)
+
+    def _fold_binary(self, optimized, command):
+        y = self._constant_at(optimized, len(optimized))
+        if y is None:
+            return False
+
+        y_value, y_length = y
+        x = self._constant_at(optimized, len(optimized) - y_length)
+        if x is None:
+            if (y_value == 0 and command.opcode in (VMCommand.ADD, VMCommand.SUB, VMCommand.OR)) or \
+               (y_value == -1 and command.opcode == VMCommand.AND):
+                # x+0, x-0, x|0, x&-1
+                del optimized[-y_length:]
+                self.rewrites['algebraic_identity'] += 1
+                return True
+            return False
+
+        x_value, x_length = x
+        return self._replace_with_constant(optimized, x_length + y_length, self._evaluate(command.opcode, x_value, y_value))
+
+    def _push_pop_to_move(self, optimized, command):
+        if not optimized or optimized[-1].opcode != VMCommand.PUSH:
+            return False
+
+        push = optimized.pop()
+        self.rewrites['move'] += 1
+        if push.segment() == command.segment() and push.index() == command.index():
+            return True
+
+        optimized.append(VMCommand('move {} {} {} {}'.format(push.segment(), push.index(), command.segment(), command.index())))
+        return True
+
+    def _simplify_ifgoto(self, optimized, command):
+        constant = self._constant_at(optimized, len(optimized))
+        if constant is not None:
+            value, length = constant
+            del optimized[-length:]
+            if value != 0:
+                optimized.append(VMCommand('goto {}'.format(command.label())))
+            self.rewrites['constant_branch'] += 1
+            return True
+
+        condition = None
+        if optimized and optimized[-1].opcode in VMCommand.COMPARISON_OPERATIONS:
+            condition = optimized.pop().operation()
+        elif len(optimized) >= 2 and optimized[-1].opcode == VMCommand.NOT and \
+                optimized[-2].opcode in VMCommand.COMPARISON_OPERATIONS:
+            # comparisons push -1 / 0, so not flips the condition
+            optimized.pop()
+            condition = self.NEGATED_CONDITIONS[optimized.pop().operation()]
+
+        if condition is None:
+            return False
+
+        optimized.append(VMCommand('compare-goto {} {}'.format(condition, command.label())))
+        self.rewrites['compare_goto'] += 1
+        return True
+
+    def _constant_at(self, optimized, end):
+        """
+        (value, number of commands) of the constant pushed by the commands ending at end, None if there is none
+        push constant c or push constant c followed by neg / not
+        """
+        if end >= 1 and self._is_push_constant(optimized[end - 1]):
+            return int(optimized[end - 1].index()), 1
+
+        if end >= 2 and optimized[end - 1].opcode in VMCommand.ARITHMETIC_UNARY_OPERATIONS and \
+                self._is_push_constant(optimized[end - 2]):
+            value = int(optimized[end - 2].index())
+            return (-value if optimized[end - 1].opcode == VMCommand.NEG else ~value), 2
+
+        return None
+
+    def _is_push_constant(self, command):
+        return command.opcode == VMCommand.PUSH and command.segment() == 'constant'
+
+    def _replace_with_constant(self, optimized, length, value):
+        # only worth it if fewer commands push the folded value than the length + 1 commands replaced
+        replacement = self._constant_commands(value)
+        if len(replacement) > length:
+            return False
+
+        del optimized[-length:]
+        optimized.extend(replacement)
+        self.rewrites['constant_folding'] += 1
+        return True
+
+    def _constant_commands(self, value):
+        value = self._to_signed(value)
+
+        if value >= 0:
+            return [VMCommand('push constant {}'.format(value))]
+        elif value == -self.MAX_CONSTANT - 1:
+            return [VMCommand('push constant {}'.format(self.MAX_CONSTANT)), VMCommand('not')]
+
+        return [VMCommand('push constant {}'.format(-value)), VMCommand('neg')]
+
+    def _evaluate(self, opcode, x, y):
+        if opcode == VMCommand.ADD:
+            return x + y
+        elif opcode == VMCommand.SUB:
+            return x - y
+        elif opcode == VMCommand.AND:
+            return x & y
+        elif opcode == VMCommand.OR:
+            return x | y
+
+        # the translated comparisons look at x - y on 16 bits, overflow included
+        difference = self._to_signed(x - y)
+        if opcode == VMCommand.EQ:
+            return -1 if difference == 0 else 0
+        elif opcode == VMCommand.LT:
+            return -1 if difference < 0 else 0
+        return -1 if difference > 0 else 0
+
+    def _to_signed(self, value):
+        value &= 0xFFFF
+        return value - 0x10000 if value & 0x8000 else value
+
+
 class VMWriter():
     """
-    simply wrapper for interacting with output file
+    buffers assembly instructions and writes them out joined in large chunks
+    output: name of the file to write or an open text stream, i.e., sys.stdout or io.StringIO, which is left open
     """
-    def __init__(self, output_file_name):
-        self.output_file = open(output_file_name, 'w')
+    CHUNK_SIZE = 16384  # instructions per write
+
+    def __init__(self, output):
+        if isinstance(output, str):
+            self.output_file = open(output, 'w')
+            self.owns_output_file = True
+        else:
+            self.output_file = output
+            self.owns_output_file = False
+
+        self.buffer = []
 
     def write(self, command):
-        self.output_file.write(command + "\n")
+        self.buffer.append(command)
+        if len(self.buffer) >= self.CHUNK_SIZE:
+            self.flush()
+
+    def write_instructions(self, instructions):
+        self.buffer.extend(instructions)
+        if len(self.buffer) >= self.CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.output_file.write('\n'.join(self.buffer))
+            self.output_file.write('\n')
+            self.buffer.clear()
+
+        self.output_file.flush()
 
     def close_file(self):
-        self.output_file.close()
+        self.flush()
+        if self.owns_output_file:
+            self.output_file.close()
+
+    def discard(self):
+        """
+        drops the instructions not written yet and closes the file without flushing them, i.e., after an error
+        """
+        self.buffer.clear()
+        if self.owns_output_file:
+            self.output_file.close()
 
 
 class VMLogicalTranslator():
@@ -177,12 +480,20 @@ class VMLogicalTranslator():
         'gt': 'JLE'
     }
 
-    def __init__(self):
+    def __init__(self, shared_comparisons=False, label_prefix=''):
+        """
+        shared_comparisons: jump to one shared routine per comparison operator instead of inlining the branches
+        label_prefix: namespace of the generated labels so translations of different files can be concatenated
+        """
         self.comparison_counters = {
             'eq' : { 'count': 0 },
             'lt' : { 'count': 0 },
             'gt' : { 'count': 0 }
         }
+        self.shared_comparisons = shared_comparisons
+        self.label_prefix = label_prefix
+        # labels of the shared routines jumped to
+        self.used_routines = set()
 
     def translate_arithmetic_binary(self, command):
         return [
@@ -204,9 +515,22 @@ class VMLogicalTranslator():
     def translate_comparison(self, command):
         counter = self.comparison_counters[command.operation()]
         counter['count'] += 1
-        label_identifier = '{}{}'.format(command.text().upper(), counter['count'])
+        label_identifier = '{}{}{}'.format(self.label_prefix, command.text().upper(), counter['count'])
         jump_directive = self.COMPARISON_OPERATIONS_JUMP_DIRECTIVES[command.operation()]
 
+        if self.shared_comparisons:
+            self.used_routines.add(self._shared_comparison_label(command.operation()))
+            return [
+                # R13 = return address
+                '@RETURN_FROM_{}'.format(label_identifier),
+                'D=A',
+                '@R13',
+                'M=D',
+                '@' + self._shared_comparison_label(command.operation()),
+                '0;JMP',
+                '(RETURN_FROM_{})'.format(label_identifier)
+            ]
+
         return [
             *self._pop_top_number_off_stack_instructions(),
             # set D to top of stack
@@ -241,6 +565,50 @@ class VMLogicalTranslator():
             *self._increment_stack_pointer_instructions()
         ]
 
+    def shared_routines(self):
+        """
+        one routine per comparison operator used in shared_comparisons mode, see Main.final_code()
+        """
+        routines = []
+
+        for operation in self.comparison_counters:
+            if self._shared_comparison_label(operation) in self.used_routines:
+                routines.extend(self._shared_comparison_routine(operation))
+
+        return routines
+
+    def _shared_comparison_label(self, operation):
+        return '${}'.format(operation.upper())
+
+    def _shared_comparison_routine(self, operation):
+        """
+        pops y and x, pushes x operation y and returns to the address in R13
+        """
+        label = self._shared_comparison_label(operation)
+        # the jump directives above jump when the comparison is false
+        jump_if_true = {'JNE': 'JEQ', 'JGE': 'JLT', 'JLE': 'JGT'}[self.COMPARISON_OPERATIONS_JUMP_DIRECTIVES[operation]]
+
+        return [
+            '({})'.format(label),
+            *self._pop_top_number_off_stack_instructions(),
+            'D=M',
+            *self._pop_top_number_off_stack_instructions(),
+            # set D to x-y
+            'D=M-D',
+            # A still points at x, assume true
+            'M=-1',
+            '@{}_TRUE'.format(label),
+            'D;{}'.format(jump_if_true),
+            '@SP',
+            'A=M',
+            'M=0',
+            '({}_TRUE)'.format(label),
+            *self._increment_stack_pointer_instructions(),
+            '@R13',
+            'A=M',
+            '0;JMP'
+        ]
+
     def _pop_top_number_off_stack_instructions(self):
         return [
             # load stack pointer
@@ -271,9 +639,9 @@ class VMPushPopTranslator():
 
     def translate_static_pop(self, command, current_file_name):
         return [
-            *self.store_top_of_stack_in_D_instructions(),
+            *self._store_top_of_stack_in_D_instructions(),
             # set value at address to D
-            *self.set_address_to_top_of_stack_instructions(
+            *self._set_address_to_top_of_stack_instructions(
                 address='{}.{}'.format(current_file_name, command.index())
             )
         ]
@@ -281,11 +649,11 @@ class VMPushPopTranslator():
     def translate_static_push(self, command, current_file_name):
         return [
             # load Filename.index
-            *self.load_referenced_value_in_D_instructions(
+            *self._load_referenced_value_in_D_instructions(
                 '{}.{}'.format(current_file_name, command.index()),
             ),
-            *self.place_value_in_D_on_top_of_stack_instructions(),
-            *self.increment_stack_pointer_instructions()
+            *self._place_value_in_D_on_top_of_stack_instructions(),
+            *self._increment_stack_pointer_instructions()
         ]
 
     def translate_push(self, command):
@@ -299,6 +667,25 @@ class VMPushPopTranslator():
     def translate_pop(self, command):
         return [
             *self._store_top_of_stack_in_D_instructions(),
+            *self._store_D_in_segment_instructions_for(command)
+        ]
+
+    def translate_move(self, source, target, current_file_name):
+        # push source followed by pop target without going through the stack
+        if source.for_static_memory_segment():
+            load = self._load_referenced_value_in_D_instructions('{}.{}'.format(current_file_name, source.index()))
+        else:
+            load = self._load_desired_value_into_D_instructions_for(source)
+
+        if target.for_static_memory_segment():
+            store = self._set_address_to_top_of_stack_instructions(address='{}.{}'.format(current_file_name, target.index()))
+        else:
+            store = self._store_D_in_segment_instructions_for(target)
+
+        return load + store
+
+    def _store_D_in_segment_instructions_for(self, command):
+        return [
             *self._store_top_of_stack_first_temp_register_instructions(),
             *self._load_base_address_instructions_for(segment=command.segment()),
             *self._add_index_to_base_address_in_D_instructions(command),
@@ -323,11 +710,11 @@ class VMPushPopTranslator():
             pointer_to_segment_base_address = self.VIRTUAL_MEMORY_SEGMENTS_BASE_ADDRESSES[segment]
             return self._load_referenced_value_in_D_instructions(address=pointer_to_segment_base_address)
         elif segment == 'temp':
-            return self.load_value_in_D_instructions(value=self.TEMP_SEGMENT_BASE_ADDRESS)
+            return self._load_value_in_D_instructions(value=self.TEMP_SEGMENT_BASE_ADDRESS)
         elif segment == 'static':
-            return self.load_value_in_D_instructions(value=self.STATIC_SEGMENT_BASE_ADDRESS)
+            return self._load_value_in_D_instructions(value=self.STATIC_SEGMENT_BASE_ADDRESS)
         elif segment == 'pointer':
-            return self.load_value_in_D_instructions(value=self.POINTER_SEGMENT_BASE_ADDRESS)
+            return self._load_value_in_D_instructions(value=self.POINTER_SEGMENT_BASE_ADDRESS)
 
     def _place_value_in_D_on_top_of_stack_instructions(self):
         return [
@@ -430,15 +817,40 @@ class VMPushPopTranslator():
         ]
 
 class VMBranchingTranslator():
+    COMPARE_GOTO_JUMP_DIRECTIVES = {
+        'eq': 'JEQ',
+        'ne': 'JNE',
+        'lt': 'JLT',
+        'ge': 'JGE',
+        'gt': 'JGT',
+        'le': 'JLE'
+    }
+
+    def __init__(self):
+        # function the labels are translated in
+        self.function_name = None
+
+    def enter_function(self, function_name):
+        self.function_name = function_name
+
+    def label_for(self, label):
+        """
+        labels are scoped to their function as function_name$label, so every class can use IF_TRUE0 etc.
+        """
+        if self.function_name is None:
+            return label
+
+        return '{}${}'.format(self.function_name, label)
+
     def translate_label(self, command):
         return [
-            '({})'.format(command.label())
+            '({})'.format(self.label_for(command.label()))
         ]
 
     def translate_goto(self, command):
         # unconditionally jump to label
         return [
-            '@' + command.label(),
+            '@' + self.label_for(command.label()),
             '0;JMP'
         ]
 
@@ -450,16 +862,270 @@ class VMBranchingTranslator():
             'AM=M-1',
             'D=M',
             # jump is not 0
-            '@' + command.label(),
+            '@' + self.label_for(command.label()),
+            'D;JNE'
+        ]
+
+    def translate_compare_goto(self, command):
+        # compare-goto condition label: pops y and x, jumps if x condition y
+        _, condition, label = command.parts()
+        return [
+            '@SP',
+            'AM=M-1',
+            'D=M',
+            '@SP',
+            'AM=M-1',
+            # set D to x-y
+            'D=M-D',
+            '@' + self.label_for(label),
+            'D;{}'.format(self.COMPARE_GOTO_JUMP_DIRECTIVES[condition])
+        ]
+
+class VMStackTopCachingTranslator():
+    """
+    optimizing code generation keeping the top of the stack in D across straight line VM commands
+    while top_in_D is set the RAM stack holds everything but the topmost value, which only lives in D
+    it is spilled onto the RAM stack before labels, gotos, calls and returns so every jump target sees the
+    plain stack layout, commands without a translation here get the same spill before their regular one
+    """
+    VIRTUAL_MEMORY_SEGMENTS_BASE_ADDRESSES = VMPushPopTranslator.VIRTUAL_MEMORY_SEGMENTS_BASE_ADDRESSES
+    FIXED_SEGMENTS_BASE_ADDRESSES = {
+        'pointer': int(VMPushPopTranslator.POINTER_SEGMENT_BASE_ADDRESS),
+        'temp': int(VMPushPopTranslator.TEMP_SEGMENT_BASE_ADDRESS)
+    }
+    # push / pop of segments added through Main.register_translation() go through their registered translation
+    CACHED_SEGMENTS = frozenset([
+        'constant', 'static', *FIXED_SEGMENTS_BASE_ADDRESSES, *VIRTUAL_MEMORY_SEGMENTS_BASE_ADDRESSES
+    ])
+    # pops up to this index walk A up from the segment base instead of going through R13 / R14
+    MAX_ADDRESS_INCREMENTS = 6
+
+    # x in M, y in D
+    ARITHMETIC_BINARY_COMPUTATIONS = {
+        'add': 'D=D+M',
+        'sub': 'D=M-D',
+        'and': 'D=D&M',
+        'or' : 'D=D|M'
+    }
+    ARITHMETIC_UNARY_OPERATORS = {
+        'neg': '-',
+        'not': '!'
+    }
+    COMPARISON_OPERATIONS_JUMP_DIRECTIVES = {
+        'eq': 'JEQ',
+        'lt': 'JLT',
+        'gt': 'JGT'
+    }
+
+    def __init__(self, label_prefix='', branching_translator=None):
+        """
+        branching_translator: scopes the labels jumped to, see VMBranchingTranslator.label_for()
+        """
+        self.top_in_D = False
+        self.comparison_count = 0
+        self.label_prefix = label_prefix
+        self.branching_translator = branching_translator or VMBranchingTranslator()
+
+    def translate(self, command, current_file_name, translation):
+        """
+        translation: callable returning the regular instructions for command, used after spilling
+        for every command not translated with the top of the stack in D
+        """
+        opcode = command.opcode
+
+        if opcode in VMCommand.MEMORY_ACCESS_OPERATIONS and command.segment() not in self.CACHED_SEGMENTS:
+            return self.spill() + translation()
+        elif opcode == VMCommand.PUSH:
+            return self.translate_push(command, current_file_name)
+        elif opcode == VMCommand.POP:
+            return self.translate_pop(command, current_file_name)
+        elif opcode in VMCommand.ARITHMETIC_BINARY_OPERATIONS:
+            return self.translate_arithmetic_binary(command)
+        elif opcode in VMCommand.ARITHMETIC_UNARY_OPERATIONS:
+            return self.translate_arithmetic_unary(command)
+        elif opcode in VMCommand.COMPARISON_OPERATIONS:
+            return self.translate_comparison(command)
+        elif opcode == VMCommand.IF_GOTO:
+            return self.translate_ifgoto(command)
+        elif opcode == VMCommand.MOVE:
+            if all(move.segment() in self.CACHED_SEGMENTS for move in command.move_commands()):
+                return self.translate_move(command, current_file_name)
+        elif opcode == VMCommand.COMPARE_GOTO:
+            return self.translate_compare_goto(command)
+
+        return self.spill() + translation()
+
+    def spill(self):
+        """
+        writes the top of the stack cached in D back onto the RAM stack
+        """
+        if not self.top_in_D:
+            return []
+
+        self.top_in_D = False
+        return [
+            '@SP',
+            'AM=M+1',
+            'A=A-1',
+            'M=D'
+        ]
+
+    def translate_push(self, command, current_file_name):
+        segment, index = command.segment(), command.index()
+        instructions = self.spill()
+        self.top_in_D = True
+
+        if segment == 'constant':
+            if index in ('0', '1'):
+                return instructions + ['D=' + index]
+            return instructions + ['@' + index, 'D=A']
+        elif segment == 'static':
+            return instructions + ['@{}.{}'.format(current_file_name, index), 'D=M']
+        elif segment in self.FIXED_SEGMENTS_BASE_ADDRESSES:
+            return instructions + ['@{}'.format(self.FIXED_SEGMENTS_BASE_ADDRESSES[segment] + int(index)), 'D=M']
+
+        base_address = self.VIRTUAL_MEMORY_SEGMENTS_BASE_ADDRESSES[segment]
+        if index == '0':
+            return instructions + ['@' + base_address, 'A=M', 'D=M']
+        elif index == '1':
+            return instructions + ['@' + base_address, 'A=M+1', 'D=M']
+
+        return instructions + ['@' + base_address, 'D=M', '@' + index, 'A=D+A', 'D=M']
+
+    def translate_pop(self, command, current_file_name):
+        segment, index = command.segment(), command.index()
+        instructions = self._top_of_stack_in_D_instructions()
+        self.top_in_D = False
+
+        if segment == 'static':
+            return instructions + ['@{}.{}'.format(current_file_name, index), 'M=D']
+        elif segment in self.FIXED_SEGMENTS_BASE_ADDRESSES:
+            return instructions + ['@{}'.format(self.FIXED_SEGMENTS_BASE_ADDRESSES[segment] + int(index)), 'M=D']
+
+        base_address = self.VIRTUAL_MEMORY_SEGMENTS_BASE_ADDRESSES[segment]
+        if int(index) <= self.MAX_ADDRESS_INCREMENTS:
+            return instructions + ['@' + base_address, 'A=M', *['A=A+1'] * int(index), 'M=D']
+
+        return instructions + [
+            # R13 = value, R14 = segment + index address
+            '@R13',
+            'M=D',
+            '@' + base_address,
+            'D=M',
+            '@' + index,
+            'D=D+A',
+            '@R14',
+            'M=D',
+            '@R13',
+            'D=M',
+            '@R14',
+            'A=M',
+            'M=D'
+        ]
+
+    def translate_arithmetic_binary(self, command):
+        instructions = self._top_of_stack_in_D_instructions()
+        self.top_in_D = True
+
+        return [
+            *instructions,
+            # pop x, the result becomes the new top of the stack in D
+            '@SP',
+            'AM=M-1',
+            self.ARITHMETIC_BINARY_COMPUTATIONS[command.operation()]
+        ]
+
+    def translate_arithmetic_unary(self, command):
+        operator = self.ARITHMETIC_UNARY_OPERATORS[command.operation()]
+
+        if self.top_in_D:
+            return ['D={}D'.format(operator)]
+
+        self.top_in_D = True
+        return ['@SP', 'AM=M-1', 'D={}M'.format(operator)]
+
+    def translate_comparison(self, command):
+        self.comparison_count += 1
+        instructions = self._top_of_stack_in_D_instructions()
+        self.top_in_D = True
+
+        return [
+            *instructions,
+            # D = x - y
+            '@SP',
+            'AM=M-1',
+            'D=M-D',
+            '@{}STACK_TOP_TRUE.{}'.format(self.label_prefix, self.comparison_count),
+            'D;{}'.format(self.COMPARISON_OPERATIONS_JUMP_DIRECTIVES[command.operation()]),
+            'D=0',
+            '@{}STACK_TOP_END.{}'.format(self.label_prefix, self.comparison_count),
+            '0;JMP',
+            '({}STACK_TOP_TRUE.{})'.format(self.label_prefix, self.comparison_count),
+            'D=-1',
+            '({}STACK_TOP_END.{})'.format(self.label_prefix, self.comparison_count)
+        ]
+
+    def translate_ifgoto(self, command):
+        instructions = self._top_of_stack_in_D_instructions()
+        self.top_in_D = False
+
+        return instructions + [
+            '@' + self.branching_translator.label_for(command.label()),
             'D;JNE'
         ]
 
+    def translate_move(self, command, current_file_name):
+        # loads the source into D like a push and stores it like a pop, the stack itself is left alone
+        source, target = command.move_commands()
+        return self.translate_push(source, current_file_name) + self.translate_pop(target, current_file_name)
+
+    def translate_compare_goto(self, command):
+        _, condition, label = command.parts()
+        instructions = self._top_of_stack_in_D_instructions()
+        self.top_in_D = False
+
+        return instructions + [
+            # D = x - y
+            '@SP',
+            'AM=M-1',
+            'D=M-D',
+            '@' + self.branching_translator.label_for(label),
+            'D;{}'.format(VMBranchingTranslator.COMPARE_GOTO_JUMP_DIRECTIVES[condition])
+        ]
+
+    def _top_of_stack_in_D_instructions(self):
+        # pops the top of the stack into D unless it is already there
+        if self.top_in_D:
+            return []
+
+        return [
+            '@SP',
+            'AM=M-1',
+            'D=M'
+        ]
+
+
 class VMFunctionTranslator():
     NUM_SEGMENTS_COPIED_TO_NEW_STACK_FRAME = 5
-
-    def __init__(self):
+    SHARED_CALL_LABEL = '$CALL'
+    SHARED_RETURN_LABEL = '$RETURN'
+    PUSH_LOCALS_LABEL = '$PUSH_LOCALS'
+    INLINE_LOCALS_THRESHOLD = 8
+
+    def __init__(self, shared_call_return=False, inline_locals_threshold=INLINE_LOCALS_THRESHOLD, label_prefix=''):
+        """
+        shared_call_return: emit the frame handling of call / return once as shared routines, see shared_routines()
+        call sites then only pass their arguments in registers and jump instead of inlining ~45 / ~50 instructions
+        inline_locals_threshold: functions with fewer locals push their zeros straight line, others call a shared loop
+        label_prefix: namespace of the generated labels so translations of different files can be concatenated
+        """
         self.function_count = 0
         self.call_count = 0
+        self.shared_call_return = shared_call_return
+        self.inline_locals_threshold = inline_locals_threshold
+        self.label_prefix = label_prefix
+        # labels of the shared routines jumped to
+        self.used_routines = set()
 
     def init_code(self):
         return [
@@ -474,46 +1140,84 @@ class VMFunctionTranslator():
 
     def translate_function_definition(self, command):
         self.function_count += 1
+        num_locals = int(command.locals())
 
+        # establish function label -> will be used to jump to spot when called
+        function_label = '({})'.format(command.function_name())
+
+        if num_locals == 0:
+            return [function_label]
+
+        if num_locals < self.inline_locals_threshold:
+            return [function_label, *self._push_zeros_instructions(num_locals)]
+
+        self.used_routines.add(self.PUSH_LOCALS_LABEL)
         return [
-            # establish function label -> will be used to jump to spot when called
-            '({})'.format(command.function_name()),
-            ## push onto the stack 0 command.locals() times
-            # initialize loop times
-            '@' + command.locals(),
-            # store in D
+            function_label,
+            ## push 0 onto the stack num_locals times in the shared routine
+            # R15 = return address
+            '@{}LOCALS_INITIALIZED.{}'.format(self.label_prefix, self.function_count),
             'D=A',
-            # establish loop label
-            '(LOOP.ADD_LOCALS.{})'.format(self.function_count),
-            # skip if D eq 0
-            '@NO_LOCALS.{}'.format(self.function_count),
-            'D;JEQ',
-            ## push 0 onto stack D times
-            # load stack pointer
+            '@R15',
+            'M=D',
+            # D = number of locals
+            '@{}'.format(num_locals),
+            'D=A',
+            '@' + self.PUSH_LOCALS_LABEL,
+            '0;JMP',
+            '({}LOCALS_INITIALIZED.{})'.format(self.label_prefix, self.function_count)
+        ]
+
+    def _push_zeros_instructions(self, num_zeros):
+        """
+        straight line pushes of 0, SP is moved once up front
+        """
+        if num_zeros == 1:
+            return ['@SP', 'AM=M+1', 'A=A-1', 'M=0']
+
+        instructions = [
+            '@{}'.format(num_zeros),
+            'D=A',
+            '@SP',
+            # move the stack pointer past the new locals and point A at the first one
+            'AM=M+D',
+            'A=A-D',
+            'M=0'
+        ]
+        for _ in range(num_zeros - 1):
+            instructions.extend(['A=A+1', 'M=0'])
+
+        return instructions
+
+    def _push_locals_routine(self):
+        """
+        expects the number of locals (> 0) in D and the return address in R15
+        """
+        return [
+            '({})'.format(self.PUSH_LOCALS_LABEL),
             '@SP',
-            # get pointer address
             'A=M',
-            # set to 0
             'M=0',
-            # increment stack pointer
             '@SP',
             'M=M+1',
-            # decrement D
             'D=D-1',
-            # load loop
-            '@LOOP.ADD_LOCALS.{}'.format(self.function_count),
-            # jump back if not 0
-            'D;JNE',
-            '(NO_LOCALS.{})'.format(self.function_count)
+            '@' + self.PUSH_LOCALS_LABEL,
+            'D;JGT',
+            '@R15',
+            'A=M',
+            '0;JMP'
         ]
 
     def translate_function_call(self, command):
         self.call_count += 1
 
+        if self.shared_call_return:
+            return self._translate_shared_function_call(command)
+
         return [
             ## push return address onto stack
             # load return address label
-            '@RET_ADDRESS.{}'.format(self.call_count),
+            '@{}RET_ADDRESS.{}'.format(self.label_prefix, self.call_count),
             # get address value
             'D=A',
             # load stack pointer
@@ -555,10 +1259,95 @@ class VMFunctionTranslator():
             '@{}'.format(command.function_name()),
             '0;JMP',
             ## label for return address
-            '(RET_ADDRESS.{})'.format(self.call_count)
+            '({}RET_ADDRESS.{})'.format(self.label_prefix, self.call_count)
         ]
 
     def translate_return(self, command):
+        if self.shared_call_return:
+            self.used_routines.add(self.SHARED_RETURN_LABEL)
+            return [
+                '@' + self.SHARED_RETURN_LABEL,
+                '0;JMP'
+            ]
+
+        return self._return_instructions()
+
+    def shared_routines(self):
+        """
+        $CALL and $RETURN routines used by call sites in shared_call_return mode and the $PUSH_LOCALS loop
+        only the routines actually jumped to are emitted, see Main.final_code()
+        """
+        routines = []
+        if self.PUSH_LOCALS_LABEL in self.used_routines:
+            routines.extend(self._push_locals_routine())
+        if self.SHARED_CALL_LABEL in self.used_routines:
+            routines.extend(self._shared_call_routine())
+        if self.SHARED_RETURN_LABEL in self.used_routines:
+            routines.append('({})'.format(self.SHARED_RETURN_LABEL))
+            routines.extend(self._return_instructions())
+
+        return routines
+
+    def _translate_shared_function_call(self, command):
+        self.used_routines.add(self.SHARED_CALL_LABEL)
+        return [
+            # R13 = nArgs
+            '@{}'.format(command.num_arguments()),
+            'D=A',
+            '@R13',
+            'M=D',
+            # R14 = address of function
+            '@{}'.format(command.function_name()),
+            'D=A',
+            '@R14',
+            'M=D',
+            # D = return address
+            '@{}RET_ADDRESS.{}'.format(self.label_prefix, self.call_count),
+            'D=A',
+            '@' + self.SHARED_CALL_LABEL,
+            '0;JMP',
+            ## label for return address
+            '({}RET_ADDRESS.{})'.format(self.label_prefix, self.call_count)
+        ]
+
+    def _shared_call_routine(self):
+        """
+        expects return address in D, nArgs in R13 and the function address in R14
+        """
+        return [
+            '({})'.format(self.SHARED_CALL_LABEL),
+            ## push return address onto stack
+            '@SP',
+            'A=M',
+            'M=D',
+            '@SP',
+            'M=M+1',
+            ## push LCL, ARG, THIS, THAT onto stack
+            *self._push_referenced_address_onto_stack('LCL'),
+            *self._push_referenced_address_onto_stack('ARG'),
+            *self._push_referenced_address_onto_stack('THIS'),
+            *self._push_referenced_address_onto_stack('THAT'),
+            ## ARG = SP - nArgs - 5
+            '@SP',
+            'D=M',
+            '@R13',
+            'D=D-M',
+            '@{}'.format(self.NUM_SEGMENTS_COPIED_TO_NEW_STACK_FRAME),
+            'D=D-A',
+            '@ARG',
+            'M=D',
+            ## LCL = SP reposition LCL
+            '@SP',
+            'D=M',
+            '@LCL',
+            'M=D',
+            ## jump to function
+            '@R14',
+            'A=M',
+            '0;JMP'
+        ]
+
+    def _return_instructions(self):
         return [
             # FRAME=LCL // FRAME is a temporary variable
             '@LCL',
@@ -615,7 +1404,7 @@ class VMFunctionTranslator():
             '0;JMP'
         ]
 
-    def _push_referenced_address_onto_stack(virtual_memory_segment):
+    def _push_referenced_address_onto_stack(self, virtual_memory_segment):
         return [
             # load register with address value
             '@{}'.format(virtual_memory_segment),
@@ -651,88 +1440,475 @@ class VMFunctionTranslator():
         ]
 
 class Main():
-    def __init__(self, input):
+    HALT_LABEL = '$HALT'
+
+    # (operation, segment) -> callable(main, command) returning the assembly instructions for command
+    # segment is only part of the key for push / pop, None for everything else
+    TRANSLATIONS = {}
+
+    def __init__(
+        self, input, shared_call_return=False, inline_locals_threshold=VMFunctionTranslator.INLINE_LOCALS_THRESHOLD,
+        cache_stack_top=False, optimize=False, shared_comparisons=False, namespace=None
+    ):
+        """
+        cache_stack_top: optimizing code generation keeping the top of the stack in D, see VMStackTopCachingTranslator
+        optimize: run the commands of every file through VMOptimizer before translating them
+        shared_comparisons: eq / lt / gt jump to one shared routine per operator, see VMLogicalTranslator
+        namespace: prefix of the labels generated for this translator and name of its statics, i.e., the name of the
+        file it translates, None to take it from the file being translated
+        """
         self.input = input
         self.current_file = None
+        self.namespace = namespace
+        # code generation options, passed on to the translators of each file by VMTranslatorDriver
+        self.options = {
+            'shared_call_return': shared_call_return,
+            'inline_locals_threshold': inline_locals_threshold,
+            'cache_stack_top': cache_stack_top,
+            'optimize': optimize,
+            'shared_comparisons': shared_comparisons
+        }
+        label_prefix = namespace + '.' if namespace else ''
         # maybe these go inside the translator and wrap up to 1 translate method
-        self.logical_translator = VMLogicalTranslator()
+        self.logical_translator = VMLogicalTranslator(shared_comparisons=shared_comparisons, label_prefix=label_prefix)
         self.push_pop_translator = VMPushPopTranslator()
         self.branching_translator = VMBranchingTranslator()
-        self.function_translator = VMFunctionTranslator()
-
-    def run_program(self):
-        if os.path.isfile(self.input):
-            # get vm files to translate
-            vm_files = [self.input]
-            # get output file name
-            ouput_file_name = input.split('.')[0] + '.asm'
-            # init writer
-            writer = VMWriter(output_file_name)
-        elif os.path.isdir(self.input):
-            # get vm files to translate
-            vm_path = os.path.join(self.input, "*.vm")
-            vm_files = glob.glob(vm_path)
-            # get output file name
-            last_dir_name = os.path.basename(input)
-            output_file_name = input + "/" + last_dir_name + ".asm"
-            # init writer
-            writer = VMWriter(output_file_name)
-            # init code specific for directory
-            init_code = self.function_translator.init_code()
-            for line in init_code:
-                writer.write(line)
-
-        for vm_file in vm_files:
-            self.current_file = vm_file
-            parser = VMParser(vm_file)
-
-            while parser.has_more_commands:
-                parser.advance()
-
-                if parser.has_invalid_current_command():
-                    continue
-
-                translation = _self.find_translation_for(parser.current_command)
-                for line in translation:
-                    writer.write(line)
+        self.function_translator = VMFunctionTranslator(
+            shared_call_return=shared_call_return, inline_locals_threshold=inline_locals_threshold, label_prefix=label_prefix
+        )
+        self.stack_top_translator = VMStackTopCachingTranslator(
+            label_prefix=label_prefix, branching_translator=self.branching_translator
+        ) if cache_stack_top else None
+        self.optimizer = VMOptimizer() if optimize else None
+        # class -> number of instructions of functions dropped by translate_file()
+        self.removed_instructions = {}
+
+    @classmethod
+    def register_translation(cls, operation, translation, segment=None):
+        """
+        registers how to translate a VM operation, i.e., for extensions adding new operations / segments
+        translation: callable(main, command) returning a list of assembly instructions
+        """
+        VMCommand.register_operation(operation)
+        cls.TRANSLATIONS[(operation, segment)] = translation
+
+    def run_program(self, jobs=1):
+        """
+        translates the .vm file or directory of .vm files given as input into one .asm file, returns its name
+        jobs: see VMTranslatorDriver.translate()
+        """
+        return VMTranslatorDriver.run(self.input, jobs=jobs, **self.options)
+
+    def translate_file(self, vm_file_name, functions=None, commands=None):
+        """
+        assembly instructions for all commands of a .vm file, ending with the stack in RAM
+        functions: names of the functions to translate, None for all. the ROM the others would have taken
+        is counted per class in removed_instructions
+        commands: the file's commands if they were already parsed, see commands_in()
+        """
+        self.current_file = vm_file_name
+        instructions = []
+        # translates dropped functions only to count their instructions
+        dead_code_translator = None
+        translating = True
+        class_name = None
+
+        if commands is None:
+            commands = self.commands_in(vm_file_name)
+
+        for command in commands:
+            if functions is not None and command.opcode == VMCommand.FUNCTION:
+                translating = command.function_name() in functions
+
+            if translating:
+                instructions.extend(self._find_translation_for(command))
+                continue
+
+            if dead_code_translator is None:
+                dead_code_translator = Main(vm_file_name, namespace=self.namespace, **self.options)
+                dead_code_translator.current_file = vm_file_name
+            class_name = command.function_name().split('.')[0] if command.opcode == VMCommand.FUNCTION else class_name
+            self.removed_instructions[class_name] = self.removed_instructions.get(class_name, 0) + sum(
+                1 for instruction in dead_code_translator._find_translation_for(command) if instruction[0] != '('
+            )
 
-        writer.close_file()
+        if self.stack_top_translator:
+            instructions.extend(self.stack_top_translator.spill())
+
+        return instructions
+
+    def commands_in(self, vm_file_name):
+        """
+        parsed commands of a .vm file, optimized if enabled
+        """
+        parser = VMParser(vm_file_name)
+        commands = []
+
+        while parser.has_more_commands:
+            parser.advance()
+
+            if not parser.has_invalid_current_command():
+                commands.append(parser.current_command)
+
+        parser.input_file.close()
+        return self.optimizer.optimize(commands) if self.optimizer else commands
+
+    def used_shared_routines(self):
+        """
+        labels of the shared routines the translated code jumps to
+        """
+        return self.logical_translator.used_routines | self.function_translator.used_routines
+
+    def use_shared_routines(self, labels):
+        """
+        makes final_code() emit the shared routines other translators jumped to
+        """
+        # each translator only emits the routines it knows about
+        self.logical_translator.used_routines.update(labels)
+        self.function_translator.used_routines.update(labels)
+
+    def final_code(self):
+        """
+        code emitted once after all vm files were translated
+        the shared routines follow an endless loop so execution running off the end of the program never falls into them
+        """
+        spill = self.stack_top_translator.spill() if self.stack_top_translator else []
+        routines = self.logical_translator.shared_routines() + self.function_translator.shared_routines()
+
+        if not routines:
+            return spill
+
+        return spill + ['({})'.format(self.HALT_LABEL), '@' + self.HALT_LABEL, '0;JMP', *routines]
 
     def _find_translation_for(self, current_command):
-        if current_command.is_push_command():
-            if current_command.for_static_memory_segment():
-                return self.push_pop_translator.translate_static_push(current_command, self._current_filename_without_extension())
-            else:
-                return self.push_pop_translator.translate_push(current_command)
-        elif current_command.is_pop_command():
-            if current_command.for_static_memory_segment():
-                return self.push_pop_translator.translate_static_pop(current_command, self._current_filename_without_extension())
-            else:
-                return self.push_pop_translator.translate_pop(current_command)
-        elif current_command.is_return_command():
-            return self.function_translator.translate_return(current_command)
-        elif current_command.is_function_definition_command():
-            return self.function_translator.translate_function_definition(current_command)
-        elif current_command.is_function_call_command():
-            return self.function_translator.translate_function_call(current_command)
-        elif current_command.is_label_command():
-            return self.branching_translator.translate_label(current_command)
-        elif current_command.is_goto_command():
-            return self.branching_translator.translate_goto(current_command)
-        elif current_command.is_ifgoto_command():
-            return self.branching_translator.translate_ifgoto(current_command)
-        elif current_command.is_arithmetic_binary_command():
-            return self.logical_translator.translate_arithmetic_binary(current_command)
-        elif current_command.is_arithmetic_unary_command():
-            return self.logical_translator.translate_arithmetic_unary(current_command)
-        elif current_command.is_comparison_command():
-            return self.logical_translator.translate_comparison(current_command)
-
-    def _current_filename_without_extension(self):
-        return self.current_file.split(".")[0].split("/")[-1]
-
-
-
-if __name__ == "__main__" and len(sys.argv) == 2:
-    input = sys.argv[1]
-    Main(input).run_program()
+        try:
+            translation = self.TRANSLATIONS[current_command.translation_key]
+        except KeyError:
+            raise ValueError('no translation registered for: {}'.format(current_command.text()))
+
+        if self.stack_top_translator:
+            return self.stack_top_translator.translate(
+                current_command, self._static_namespace(), lambda: translation(self, current_command)
+            )
+
+        return translation(self, current_command)
+
+    def _translate_push(self, command):
+        return self.push_pop_translator.translate_push(command)
+
+    def _translate_static_push(self, command):
+        return self.push_pop_translator.translate_static_push(command, self._static_namespace())
+
+    def _translate_pop(self, command):
+        return self.push_pop_translator.translate_pop(command)
+
+    def _translate_static_pop(self, command):
+        return self.push_pop_translator.translate_static_pop(command, self._static_namespace())
+
+    def _translate_arithmetic_binary(self, command):
+        return self.logical_translator.translate_arithmetic_binary(command)
+
+    def _translate_arithmetic_unary(self, command):
+        return self.logical_translator.translate_arithmetic_unary(command)
+
+    def _translate_comparison(self, command):
+        return self.logical_translator.translate_comparison(command)
+
+    def _translate_move(self, command):
+        source, target = command.move_commands()
+        return self.push_pop_translator.translate_move(source, target, self._static_namespace())
+
+    def _translate_label(self, command):
+        return self.branching_translator.translate_label(command)
+
+    def _translate_goto(self, command):
+        return self.branching_translator.translate_goto(command)
+
+    def _translate_ifgoto(self, command):
+        return self.branching_translator.translate_ifgoto(command)
+
+    def _translate_compare_goto(self, command):
+        return self.branching_translator.translate_compare_goto(command)
+
+    def _translate_function_definition(self, command):
+        self.branching_translator.enter_function(command.function_name())
+        return self.function_translator.translate_function_definition(command)
+
+    def _translate_function_call(self, command):
+        return self.function_translator.translate_function_call(command)
+
+    def _translate_return(self, command):
+        return self.function_translator.translate_return(command)
+
+    def _static_namespace(self):
+        """
+        statics are named <FileName>.<index>, dots in directory names or a leading ./ must not leak into it
+        """
+        return self.namespace or os.path.splitext(os.path.basename(self.current_file))[0]
+
+def _register_built_in_translations():
+    """
+    translations of the standard VM commands, a function so the loop variables stay out of the module
+    """
+    for segment in [ 'local', 'argument', 'this', 'that', 'temp', 'pointer', 'constant' ]:
+        Main.register_translation('push', Main._translate_push, segment=segment)
+    for segment in [ 'local', 'argument', 'this', 'that', 'temp', 'pointer' ]:
+        Main.register_translation('pop', Main._translate_pop, segment=segment)
+    Main.register_translation('push', Main._translate_static_push, segment='static')
+    Main.register_translation('pop', Main._translate_static_pop, segment='static')
+    for operation in [ 'add', 'sub', 'and', 'or' ]:
+        Main.register_translation(operation, Main._translate_arithmetic_binary)
+    for operation in [ 'neg', 'not' ]:
+        Main.register_translation(operation, Main._translate_arithmetic_unary)
+    for operation in [ 'eq', 'lt', 'gt' ]:
+        Main.register_translation(operation, Main._translate_comparison)
+    Main.register_translation('label', Main._translate_label)
+    Main.register_translation('goto', Main._translate_goto)
+    Main.register_translation('if-goto', Main._translate_ifgoto)
+    Main.register_translation('function', Main._translate_function_definition)
+    Main.register_translation('call', Main._translate_function_call)
+    Main.register_translation('return', Main._translate_return)
+    # produced by VMOptimizer
+    Main.register_translation('move', Main._translate_move)
+    Main.register_translation('compare-goto', Main._translate_compare_goto)
+
+_register_built_in_translations()
+
+
+class VMCallGraph():
+    """
+    functions each function calls, built from the function / call commands of a program
+    calls made outside of any function are recorded under None
+    """
+    ENTRY_FUNCTION = 'Sys.init'
+
+    def __init__(self):
+        self.calls = {None: set()}
+
+    def add_commands(self, commands):
+        function_name = None
+
+        for command in commands:
+            if command.opcode == VMCommand.FUNCTION:
+                function_name = command.function_name()
+                self.calls.setdefault(function_name, set())
+            elif command.opcode == VMCommand.CALL:
+                self.calls[function_name].add(command.function_name())
+
+    def reachable_from(self, function_names):
+        reachable = set()
+        to_visit = list(function_names)
+
+        while to_visit:
+            function_name = to_visit.pop()
+            if function_name in reachable:
+                continue
+
+            reachable.add(function_name)
+            to_visit.extend(self.calls.get(function_name, ()))
+
+        return reachable
+
+
+class VMTranslatorDriver():
+    """
+    translates a .vm file or a directory of .vm files into a single .asm program
+    every file gets its own Main with labels namespaced by the file name, so files can be translated
+    concurrently and the output only depends on the sorted order of the files
+    """
+    VM_FILE_PATTERN = '*.vm'
+    ASM_FILE_EXTENSION = '.asm'
+    PARTIAL_FILE_SUFFIX = '.partial'
+
+    @classmethod
+    def vm_files_in(cls, path):
+        if os.path.isdir(path):
+            return sorted(glob.glob(os.path.join(path, cls.VM_FILE_PATTERN)))
+
+        return [path]
+
+    @classmethod
+    def output_file_name(cls, path):
+        """
+        Foo.vm -> Foo.asm, directory Foo -> Foo/Foo.asm
+        """
+        if os.path.isdir(path):
+            path = os.path.normpath(path)
+            return os.path.join(path, os.path.basename(path) + cls.ASM_FILE_EXTENSION)
+
+        return os.path.splitext(path)[0] + cls.ASM_FILE_EXTENSION
+
+    @classmethod
+    def translate_file(cls, vm_file_name, commands=None, functions=None, **options):
+        """
+        assembly instructions of a single file, the labels of the shared routines they jump to
+        and the instructions of dropped functions per class, see Main.translate_file()
+        """
+        namespace = os.path.splitext(os.path.basename(vm_file_name))[0]
+        translator = Main(vm_file_name, namespace=namespace, **options)
+        instructions = translator.translate_file(vm_file_name, functions=functions, commands=commands)
+
+        return instructions, translator.used_shared_routines(), translator.removed_instructions
+
+    @classmethod
+    def reachable_functions(cls, commands_of_files):
+        """
+        names of the functions reachable from Sys.init, None if the program has no Sys.init
+        commands_of_files: the parsed commands of every file of the program
+        """
+        call_graph = VMCallGraph()
+        for commands in commands_of_files:
+            call_graph.add_commands(commands)
+
+        if VMCallGraph.ENTRY_FUNCTION not in call_graph.calls:
+            return None
+
+        return call_graph.reachable_from([VMCallGraph.ENTRY_FUNCTION, *call_graph.calls[None]])
+
+    @classmethod
+    def translate(cls, path, jobs=1, eliminate_dead_functions=False, removed_instructions=None, **options):
+        """
+        assembly instructions of the whole program, directories start with the bootstrap code
+        jobs: number of worker processes, 1 to translate in this process, None for one per cpu
+        worker processes are opt-in and currently not faster: a file takes milliseconds to translate, so starting
+        the pool and pickling the results back costs more than it saves, even on hundreds of files, see benchmark.py driver
+        eliminate_dead_functions: drop functions not reachable from Sys.init through calls
+        removed_instructions: dict filled with the instructions dropped per class
+        """
+        instructions = []
+        for chunk in cls.translate_chunks(
+            path, jobs=jobs, eliminate_dead_functions=eliminate_dead_functions, removed_instructions=removed_instructions,
+            **options
+        ):
+            instructions.extend(chunk)
+
+        return instructions
+
+    @classmethod
+    def translate_chunks(cls, path, jobs=1, eliminate_dead_functions=False, removed_instructions=None, **options):
+        """
+        the program as lists of instructions in output order: bootstrap, one list per file, shared routines
+        jobs: see translate(), worker processes are opt-in and currently slower than translating in this process
+        """
+        vm_file_names = cls.vm_files_in(path)
+        program = Main(path, **options)
+        if os.path.isdir(path):
+            yield program.function_translator.init_code()
+
+        if eliminate_dead_functions:
+            # the call graph needs every file parsed up front, the commands are then translated as they are
+            commands_of_files = [program.commands_in(vm_file_name) for vm_file_name in vm_file_names]
+            functions = cls.reachable_functions(commands_of_files)
+        else:
+            # each file is parsed where it is translated
+            commands_of_files = [None] * len(vm_file_names)
+            functions = None
+        translate_file = functools.partial(cls.translate_file, functions=functions, **options)
+        jobs = jobs or os.cpu_count() or 1
+
+        if jobs == 1 or len(vm_file_names) <= 1:
+            translations = list(map(translate_file, vm_file_names, commands_of_files))
+        else:
+            # a few chunks per worker keeps the pool busy without a round trip per file
+            chunk_size = max(1, len(vm_file_names) // (jobs * 4))
+            with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+                translations = list(executor.map(translate_file, vm_file_names, commands_of_files, chunksize=chunk_size))
+
+        for file_instructions, used_routines, file_removed_instructions in translations:
+            yield file_instructions
+            program.use_shared_routines(used_routines)
+            if removed_instructions is not None:
+                for class_name, num_instructions in file_removed_instructions.items():
+                    removed_instructions[class_name] = removed_instructions.get(class_name, 0) + num_instructions
+
+        yield program.final_code()
+
+    @classmethod
+    def run(cls, path, output=None, jobs=1, eliminate_dead_functions=False, removed_instructions=None, **options):
+        """
+        writes the translation of path to output, a file name (default: see output_file_name()) or an open
+        text stream such as sys.stdout to pipe the program into the assembler, returns output
+        a file is written under a temporary name next to it and only renamed once the whole program was translated,
+        so an error in any .vm file leaves a previous .asm file untouched
+        every file is translated before its instructions are written, so on an error nothing reaches a stream either
+        """
+        output = output or cls.output_file_name(path)
+        partial_output = output + cls.PARTIAL_FILE_SUFFIX if isinstance(output, str) else None
+
+        writer = VMWriter(partial_output or output)
+        try:
+            for chunk in cls.translate_chunks(
+                path, jobs=jobs, eliminate_dead_functions=eliminate_dead_functions, removed_instructions=removed_instructions,
+                **options
+            ):
+                writer.write_instructions(chunk)
+        except BaseException:
+            writer.discard()
+            if partial_output:
+                os.remove(partial_output)
+            raise
+        writer.close_file()
+
+        if partial_output:
+            os.replace(partial_output, output)
+
+        return output
+
+
+def main(argv):
+    """
+    exit codes: 0 translated, 2 no .vm files found
+    """
+    argument_parser = argparse.ArgumentParser(description='VM translator: translates .vm files into Hack assembly')
+    argument_parser.add_argument('path', help='.vm file or directory containing .vm files')
+    argument_parser.add_argument('--output', '-o', help='.asm file to write, - for stdout, defaults to next to the input')
+    argument_parser.add_argument(
+        '--jobs', '-j', type=int, default=1,
+        help='worker processes, opt-in and currently not faster than the default of translating in this process'
+    )
+    argument_parser.add_argument('--optimize', '-O', action='store_true', help='run the VM optimizer before translating')
+    argument_parser.add_argument('--cache-stack-top', action='store_true', help='keep the top of the stack in D')
+    argument_parser.add_argument('--shared-call-return', action='store_true', help='jump to shared call / return routines')
+    argument_parser.add_argument('--shared-comparisons', action='store_true', help='jump to shared eq / lt / gt routines')
+    argument_parser.add_argument(
+        '--inline-locals-threshold', type=int, default=VMFunctionTranslator.INLINE_LOCALS_THRESHOLD,
+        help='functions with at least this many locals initialize them in a shared loop'
+    )
+    argument_parser.add_argument(
+        '--eliminate-dead-functions', action='store_true',
+        help='drop functions not reachable from Sys.init and report the instructions removed per class'
+    )
+    arguments = argument_parser.parse_args(argv)
+
+    if not os.path.exists(arguments.path) or not VMTranslatorDriver.vm_files_in(arguments.path):
+        print('no .vm files found', file=sys.stderr)
+        return 2
+
+    output = sys.stdout if arguments.output == '-' else arguments.output
+    removed_instructions = {}
+    output = VMTranslatorDriver.run(
+        arguments.path,
+        output=output,
+        jobs=arguments.jobs,
+        eliminate_dead_functions=arguments.eliminate_dead_functions,
+        removed_instructions=removed_instructions,
+        optimize=arguments.optimize,
+        cache_stack_top=arguments.cache_stack_top,
+        shared_call_return=arguments.shared_call_return,
+        shared_comparisons=arguments.shared_comparisons,
+        inline_locals_threshold=arguments.inline_locals_threshold
+    )
+    if output is not sys.stdout:
+        print(output)
+
+    if arguments.eliminate_dead_functions:
+        # stderr so the report never ends up in a program written to stdout
+        for class_name, num_instructions in sorted(removed_instructions.items()):
+            print('{:<16} {:>7} instructions removed'.format(class_name, num_instructions), file=sys.stderr)
+        print('{:<16} {:>7} instructions removed'.format('total', sum(removed_instructions.values())), file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
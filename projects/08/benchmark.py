@@ -0,0 +1,322 @@
+"""
+Benchmarks for the VM translator
+
+usage:
+    python3 benchmark.py translate [.vm files or directories] [--repeat N]
+        translates the given programs (default: the whole OS in tools/OS plus the Square game) and reports
+        how long parsing and translating took and how many VM commands per second that comes down to
+    python3 benchmark.py cycles
+        ROM size and executed CPU cycles of the test programs for each code generation mode, runs the
+        assembled programs on a Hack CPU emulator and checks the results against the .cmp files
+    python3 benchmark.py driver [--copies N] [--jobs N ...] [--repeat N]
+        wall time of translating a directory of dozens of .vm files (N renamed copies of the default
+        programs) in this process vs across worker processes
+"""
+import os
+import re
+import sys
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+
+from VMTranslator import Main, VMParser, VMTranslatorDriver
+
+PROJECT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(PROJECT_DIR, '..', '06'))
+
+from HackAssembler import HackAssembler
+
+DEFAULT_PROGRAMS = [
+    os.path.join(PROJECT_DIR, '..', '..', 'tools', 'OS'),
+    os.path.join(PROJECT_DIR, '..', '11', 'expected', 'Square')
+]
+TEST_PROGRAMS = [
+    os.path.join(PROJECT_DIR, '..', '07', 'StackArithmetic', 'SimpleAdd', 'SimpleAdd.vm'),
+    os.path.join(PROJECT_DIR, '..', '07', 'StackArithmetic', 'StackTest', 'StackTest.vm'),
+    os.path.join(PROJECT_DIR, '..', '07', 'MemoryAccess', 'BasicTest', 'BasicTest.vm'),
+    os.path.join(PROJECT_DIR, '..', '07', 'MemoryAccess', 'PointerTest', 'PointerTest.vm'),
+    os.path.join(PROJECT_DIR, '..', '07', 'MemoryAccess', 'StaticTest', 'StaticTest.vm'),
+    os.path.join(PROJECT_DIR, 'ProgramFlow', 'BasicLoop', 'BasicLoop.vm'),
+    os.path.join(PROJECT_DIR, 'ProgramFlow', 'FibonacciSeries', 'FibonacciSeries.vm'),
+    os.path.join(PROJECT_DIR, 'FunctionCalls', 'SimpleFunction', 'SimpleFunction.vm'),
+    os.path.join(PROJECT_DIR, 'FunctionCalls', 'NestedCall'),
+    os.path.join(PROJECT_DIR, 'FunctionCalls', 'FibonacciElement'),
+    os.path.join(PROJECT_DIR, 'FunctionCalls', 'StaticsTest')
+]
+# Main options of each code generation mode compared by the cycles benchmark
+CODEGEN_MODES = {
+    'inline': {},
+    'shared_call_return': {'shared_call_return': True},
+    'shared_push_locals': {'inline_locals_threshold': 0},
+    'cache_stack_top': {'cache_stack_top': True},
+    'optimize': {'optimize': True},
+    'optimize_cache_stack_top': {'optimize': True, 'cache_stack_top': True},
+    'shared_comparisons': {'shared_comparisons': True}
+}
+
+
+def vm_files_in(paths):
+    vm_file_names = []
+
+    for path in paths:
+        if os.path.isdir(path):
+            vm_file_names.extend(sorted(glob.glob(os.path.join(path, '*.vm'))))
+        else:
+            vm_file_names.append(path)
+
+    return vm_file_names
+
+
+def parse(vm_file_names):
+    commands = []
+
+    for vm_file_name in vm_file_names:
+        parser = VMParser(vm_file_name)
+        while parser.has_more_commands:
+            parser.advance()
+
+            if not parser.has_invalid_current_command():
+                commands.append((vm_file_name, parser.current_command))
+
+    return commands
+
+
+def translate(commands):
+    translator = Main(None)
+    num_instructions = 0
+
+    for vm_file_name, command in commands:
+        translator.current_file = vm_file_name
+        num_instructions += len(translator._find_translation_for(command))
+
+    return num_instructions
+
+
+def translate_program(path, **options):
+    """
+    assembly lines for a .vm file or a directory of them, directories get the bootstrap code
+    """
+    return VMTranslatorDriver.translate(path, jobs=1, **options)
+
+
+class HackCPU():
+    """
+    emulates the Hack CPU running a ROM image, one cycle per instruction like the CPUEmulator
+    """
+    RAM_SIZE = 32768
+    JUMP_TO_SELF = 0b1110101010000111  # 0;JMP
+
+    def __init__(self, rom, ram=None):
+        self.rom = list(rom)
+        self.ram = [0] * self.RAM_SIZE
+        for address, value in (ram or {}).items():
+            self.ram[address] = value & 0xFFFF
+
+        self.a = self.d = self.pc = 0
+        self.cycles = 0
+
+    def halted(self):
+        """
+        past the end of the ROM or stuck in an '@X 0;JMP' loop at X
+        """
+        return self.pc >= len(self.rom) or self.pc in self.halting_addresses()
+
+    def halting_addresses(self):
+        return {
+            address for address, instruction in enumerate(self.rom[:-1])
+            if instruction == address and self.rom[address + 1] == self.JUMP_TO_SELF
+        }
+
+    def run(self, max_cycles):
+        rom, ram = self.rom, self.ram
+        a, d, pc, cycles = self.a, self.d, self.pc, self.cycles
+        halting_addresses = self.halting_addresses()
+        rom_size = len(rom)
+
+        while cycles < max_cycles and pc < rom_size and pc not in halting_addresses:
+            instruction = rom[pc]
+            cycles += 1
+
+            if instruction < 0x8000:
+                a = instruction
+                pc += 1
+                continue
+
+            x = d
+            y = ram[a & 0x7FFF] if instruction & 0x1000 else a
+            if instruction & 0x800:
+                x = 0
+            if instruction & 0x400:
+                x = ~x
+            if instruction & 0x200:
+                y = 0
+            if instruction & 0x100:
+                y = ~y
+            out = x + y if instruction & 0x80 else x & y
+            if instruction & 0x40:
+                out = ~out
+            out &= 0xFFFF
+
+            if instruction & 0x8:
+                ram[a & 0x7FFF] = out
+            if instruction & 0x10:
+                d = out
+            jump_address = a
+            if instruction & 0x20:
+                a = out
+
+            negative, zero = out & 0x8000, out == 0
+            if (instruction & 0x4 and negative) or (instruction & 0x2 and zero) or (instruction & 0x1 and not negative and not zero):
+                pc = jump_address
+            else:
+                pc += 1
+
+        self.a, self.d, self.pc, self.cycles = a, d, pc, cycles
+        return cycles
+
+    def signed(self, address):
+        value = self.ram[address]
+        return value - 0x10000 if value & 0x8000 else value
+
+
+def test_script_for(path):
+    """
+    initial RAM, cycle limit, RAM addresses compared and their expected values from the .tst / .cmp files
+    """
+    test_name = os.path.join(path if os.path.isdir(path) else os.path.dirname(path), os.path.basename(path.rstrip(os.sep)))
+    test_name = os.path.splitext(test_name)[0]
+
+    with open(test_name + '.tst') as tst_file:
+        script = tst_file.read()
+    ram = {int(address): int(value) for address, value in re.findall(r'set RAM\[(\d+)\]\s+(-?\d+)', script)}
+    repeat = re.search(r'repeat (\d+)', script)
+    addresses = [int(address) for address in re.findall(r'RAM\[(\d+)\]%', script)]
+
+    with open(test_name + '.cmp') as cmp_file:
+        rows = [row for row in cmp_file.read().splitlines() if row.strip()]
+    expected = [int(value) for row in rows[1::2] for value in row.strip().strip('|').split('|')]
+
+    return ram, int(repeat.group(1)) if repeat else 10000, addresses, expected
+
+
+def run_test_program(path, **options):
+    """
+    ROM size, cycles until halt (or the .tst cycle limit) and whether RAM matches the .cmp file
+    """
+    rom = list(HackAssembler.assemble_lines(translate_program(path, **options)))
+    ram, max_cycles, addresses, expected = test_script_for(path)
+    cpu = HackCPU(rom, ram)
+    cycles = cpu.run(max_cycles)
+
+    return len(rom), cycles, [cpu.signed(address) for address in addresses] == expected
+
+
+def rom_size(paths, **options):
+    lines = []
+    for path in paths:
+        lines.extend(translate_program(path, **options))
+    return sum(1 for _ in HackAssembler.assemble_lines(lines))
+
+
+def benchmark_cycles():
+    lines = ['{:<18} {:<26} {:>6} {:>8} {:>4}'.format('program', 'mode', 'ROM', 'cycles', 'ok')]
+
+    for path in TEST_PROGRAMS:
+        for mode, options in CODEGEN_MODES.items():
+            size, cycles, ok = run_test_program(path, **options)
+            lines.append('{:<18} {:<26} {:>6} {:>8} {:>4}'.format(
+                os.path.splitext(os.path.basename(path))[0], mode, size, cycles, 'yes' if ok else 'NO'
+            ))
+
+    for mode, options in CODEGEN_MODES.items():
+        lines.append('{:<18} {:<26} {:>6}'.format('OS + Square', mode, rom_size(DEFAULT_PROGRAMS, **options)))
+
+    return '\n'.join(lines)
+
+
+def write_copies(vm_file_names, num_copies, directory):
+    """
+    num_copies renamed copies of every file, so each copy is its own class with its own statics
+    """
+    for copy in range(num_copies):
+        for vm_file_name in vm_file_names:
+            name = os.path.splitext(os.path.basename(vm_file_name))[0]
+            with open(vm_file_name) as vm_file:
+                code = vm_file.read().replace(name + '.', '{}{}.'.format(name, copy))
+            with open(os.path.join(directory, '{}{}.vm'.format(name, copy)), 'w') as copy_file:
+                copy_file.write(code)
+
+
+def benchmark_driver(num_copies, jobs, repeat):
+    directory = tempfile.mkdtemp()
+    lines = []
+
+    try:
+        write_copies(vm_files_in(DEFAULT_PROGRAMS), num_copies, directory)
+        num_files = len(VMTranslatorDriver.vm_files_in(directory))
+        expected = VMTranslatorDriver.translate(directory, jobs=1)
+        lines.append('{} files, {} assembly instructions'.format(num_files, len(expected)))
+
+        for num_jobs in jobs:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                instructions = VMTranslatorDriver.translate(directory, jobs=num_jobs)
+                timings.append(time.perf_counter() - start)
+
+            lines.append('jobs={:<3} {:>8.4f}s {}'.format(
+                num_jobs, min(timings), 'same output' if instructions == expected else 'OUTPUT DIFFERS'
+            ))
+    finally:
+        shutil.rmtree(directory)
+
+    return '\n'.join(lines)
+
+
+def benchmark(vm_file_names, repeat):
+    timings = {'parse': [], 'translate': []}
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        commands = parse(vm_file_names)
+        timings['parse'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        num_instructions = translate(commands)
+        timings['translate'].append(time.perf_counter() - start)
+
+    return {phase: min(seconds) for phase, seconds in timings.items()}, len(commands), num_instructions
+
+
+def main(argv):
+    argument_parser = argparse.ArgumentParser(description='VM translator benchmarks')
+    subparsers = argument_parser.add_subparsers(dest='benchmark')
+    translate_parser = subparsers.add_parser('translate', help='parse / translate throughput')
+    translate_parser.add_argument('paths', nargs='*', default=DEFAULT_PROGRAMS)
+    translate_parser.add_argument('--repeat', type=int, default=5, help='runs per phase, best time is kept')
+    subparsers.add_parser('cycles', help='ROM size and executed cycles per code generation mode')
+    driver_parser = subparsers.add_parser('driver', help='sequential vs concurrent translation of many files')
+    driver_parser.add_argument('--copies', type=int, default=5, help='copies of the default programs')
+    driver_parser.add_argument('--jobs', type=int, nargs='+', default=[1, os.cpu_count() or 1, 4])
+    driver_parser.add_argument('--repeat', type=int, default=3, help='runs per job count, best time is kept')
+    arguments = argument_parser.parse_args(argv)
+
+    if arguments.benchmark == 'cycles':
+        print(benchmark_cycles())
+        return
+    elif arguments.benchmark == 'driver':
+        print(benchmark_driver(arguments.copies, arguments.jobs, arguments.repeat))
+        return
+
+    vm_file_names = vm_files_in(getattr(arguments, 'paths', DEFAULT_PROGRAMS))
+    timings, num_commands, num_instructions = benchmark(vm_file_names, getattr(arguments, 'repeat', 5))
+
+    print('{} files, {} VM commands -> {} assembly instructions'.format(len(vm_file_names), num_commands, num_instructions))
+    for phase, seconds in list(timings.items()) + [('total', sum(timings.values()))]:
+        print('{:<10} {:>8.4f}s {:>12,.0f} commands/sec'.format(phase, seconds, num_commands / seconds))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,383 @@
+import io
+import unittest
+import shutil
+import tempfile
+from unittest import mock
+
+# add source files to path
+import os, sys
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.append(PROJECT_DIR)
+sys.path.append(os.path.join(PROJECT_DIR, '..', '06'))
+
+from VMTranslator import Main, VMCommand, VMOptimizer, VMTranslatorDriver
+from benchmark import HackCPU
+from HackAssembler import HackAssembler
+
+class TestVMCommand(unittest.TestCase):
+    def test_opcodes(self):
+        ## IT ASSIGNS EVERY COMMAND ITS OPCODE AND TRANSLATION KEY ONCE ON CREATION
+        push = VMCommand('push local 2')
+        self.assertEqual((push.opcode, push.translation_key), (VMCommand.PUSH, ('push', 'local')))
+        ifgoto = VMCommand('if-goto LOOP')
+        self.assertEqual((ifgoto.opcode, ifgoto.translation_key), (VMCommand.IF_GOTO, ('if-goto', None)))
+        self.assertTrue(VMCommand('lt').is_comparison_command())
+        self.assertTrue(VMCommand('not').is_arithmetic_unary_command())
+        with self.assertRaisesRegex(ValueError, 'unknown VM command: jump LOOP'):
+            VMCommand('jump LOOP')
+
+    def test_arguments(self):
+        ## IT ONLY ANSWERS FOR THE ARGUMENTS A COMMAND HAS
+        push = VMCommand('push static 3')
+        self.assertEqual((push.segment(), push.index()), ('static', '3'))
+        self.assertTrue(push.for_static_memory_segment())
+        self.assertIsNone(push.function_name())
+
+        function = VMCommand('function Main.main 2')
+        self.assertEqual((function.function_name(), function.locals()), ('Main.main', '2'))
+        self.assertIsNone(function.segment())
+        call = VMCommand('call Math.multiply 2')
+        self.assertEqual((call.function_name(), call.num_arguments()), ('Math.multiply', '2'))
+        self.assertIsNone(call.index())
+        self.assertEqual(VMCommand('goto END').label(), 'END')
+
+    def test_comments_and_whitespace(self):
+        ## IT STRIPS COMMENTS AND WHITESPACE AROUND A COMMAND
+        command = VMCommand('   push  constant 7   // seven\n')
+        self.assertEqual(command.text(), 'push  constant 7')
+        self.assertEqual(command.parts(), ['push', 'constant', '7'])
+        self.assertEqual(command.opcode, VMCommand.PUSH)
+
+        for line in ['// comment\n', '\n', '    \n', '']:
+            self.assertIsNone(VMCommand(line).opcode, repr(line))
+        self.assertTrue(VMCommand('// comment\n').is_comment())
+        self.assertTrue(VMCommand('\n').is_whitespace())
+        self.assertTrue(VMCommand('').is_empty())
+
+class TestVMOptimizer(unittest.TestCase):
+    def optimize(self, lines):
+        self.optimizer = VMOptimizer()
+        return [command.text() for command in self.optimizer.optimize(VMCommand(line) for line in lines)]
+
+    def test_constant_folding(self):
+        ## IT FOLDS ARITHMETIC ON CONSTANTS INTO A SINGLE PUSH
+        lines = ['push constant 7', 'push constant 8', 'add', 'push constant 2', 'sub', 'neg']
+        self.assertEqual(self.optimize(lines), ['push constant 13', 'neg'])
+        self.assertEqual(self.optimize(['push constant 0', 'not', 'not']), ['push constant 0'])
+        self.assertEqual(self.optimize(['push constant 0', 'not']), ['push constant 0', 'not'])
+
+    def test_constant_folding_wraps_like_the_cpu(self):
+        ## IT FOLDS ON 16 BITS AND COMPARES THE WAY THE TRANSLATED CODE DOES
+        self.assertEqual(self.optimize(['push constant 32767', 'push constant 1', 'add']), ['push constant 32767', 'not'])
+        self.assertEqual(self.optimize(['push constant 3', 'push constant 5', 'lt']), ['push constant 1', 'neg'])
+        # 32767 - (-1) overflows to a negative number
+        self.assertEqual(self.optimize(['push constant 32767', 'push constant 1', 'neg', 'gt']), ['push constant 0'])
+
+    def test_algebraic_identities(self):
+        ## IT DROPS OPERATIONS LEAVING THEIR OPERAND UNCHANGED
+        lines = ['push local 0', 'push constant 0', 'add', 'neg', 'neg', 'push constant 0', 'not', 'and']
+        self.assertEqual(self.optimize(lines), ['push local 0'])
+        self.assertEqual(self.optimize(['push local 0', 'push constant 1', 'add']), ['push local 0', 'push constant 1', 'add'])
+
+    def test_push_pop_to_move(self):
+        ## IT MOVES VALUES BETWEEN SEGMENTS WITHOUT THE STACK
+        lines = ['push local 0', 'pop temp 0', 'push argument 1', 'pop argument 1', 'push constant 1', 'push constant 2', 'add', 'pop static 3']
+        self.assertEqual(self.optimize(lines), ['move local 0 temp 0', 'move constant 3 static 3'])
+        self.assertEqual(self.optimizer.rewrites['move'], 3)
+
+    def test_ifgoto(self):
+        ## IT TURNS NOT; IF-GOTO AFTER A COMPARISON INTO A SINGLE COMPARE AND JUMP
+        lines = ['push local 0', 'push constant 5', 'lt', 'not', 'if-goto END', 'push local 0', 'push local 1', 'eq', 'if-goto LOOP']
+        self.assertEqual(self.optimize(lines), ['push local 0', 'push constant 5', 'compare-goto ge END', 'push local 0', 'push local 1', 'compare-goto eq LOOP'])
+        # not on anything else than a comparison's -1 / 0 is left alone
+        self.assertEqual(self.optimize(['push local 0', 'not', 'if-goto END']), ['push local 0', 'not', 'if-goto END'])
+
+    def test_constant_branch(self):
+        ## IT RESOLVES BRANCHES ON CONSTANTS AT TRANSLATION TIME
+        self.assertEqual(self.optimize(['push constant 0', 'not', 'if-goto LOOP']), ['goto LOOP'])
+        self.assertEqual(self.optimize(['push constant 0', 'if-goto LOOP', 'label LOOP']), ['label LOOP'])
+
+    def test_labels_are_barriers(self):
+        ## IT NEVER FOLDS ACROSS A LABEL
+        lines = ['push constant 1', 'label LOOP', 'push constant 2', 'add', 'push local 0', 'label SKIP', 'pop local 1']
+        self.assertEqual(self.optimize(lines), lines)
+        self.assertEqual(self.optimizer.original_size, self.optimizer.optimized_size)
+
+    def test_translation(self):
+        ## IT TRANSLATES THE OPERATIONS ONLY THE OPTIMIZER PRODUCES IN BOTH CODE GENERATION MODES
+        for cache_stack_top in [False, True]:
+            translator = Main(None, cache_stack_top=cache_stack_top)
+            translator.current_file = 'Foo.vm'
+            move = translator._find_translation_for(VMCommand('move static 1 temp 2'))
+            self.assertEqual(move[:2], ['@Foo.1', 'D=M'])
+            compare_goto = translator._find_translation_for(VMCommand('compare-goto le END'))
+            self.assertEqual(compare_goto[-2:], ['@END', 'D;JLE'])
+
+class TestTranslatedPrograms(unittest.TestCase):
+    """
+    runs translated programs on the Hack CPU emulator of benchmark.py
+    """
+    SP, LCL, ARG, THIS, THAT = range(5)
+    MAX_CYCLES = 100000
+    COMPARISON_MODES = [
+        {},
+        {'cache_stack_top': True},
+        {'shared_comparisons': True},
+        {'shared_comparisons': True, 'shared_call_return': True}
+    ]
+
+    def run_program(self, vm_lines, ram=None, **options):
+        """
+        translates vm_lines as Sys.vm with the bootstrap code, returns the CPU once it halted
+        """
+        program_dir = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(program_dir, 'Sys.vm'), 'w') as vm_file:
+                vm_file.write('\n'.join(vm_lines))
+            self.instructions = VMTranslatorDriver.translate(program_dir, jobs=1, **options)
+        finally:
+            shutil.rmtree(program_dir)
+
+        cpu = HackCPU(HackAssembler.assemble_lines(self.instructions), ram)
+        cpu.run(self.MAX_CYCLES)
+        self.assertTrue(cpu.halted())
+        return cpu
+
+    def test_shared_call_return(self):
+        ## IT KEEPS THE CALLING CONVENTION WHEN CALLS AND RETURNS JUMP TO SHARED ROUTINES
+        vm_lines = [
+            'function Sys.init 0',
+            'push constant 3', 'push constant 4', 'call Sys.add 2',
+            'label END', 'goto END',
+            'function Sys.add 1',
+            'push argument 0', 'push argument 1', 'add', 'pop local 0',
+            # the caller's THIS is restored on return
+            'push constant 1000', 'pop pointer 0',
+            'push local 0', 'return'
+        ]
+        for shared_call_return in [False, True]:
+            cpu = self.run_program(vm_lines, ram={self.THIS: 3000, self.THAT: 4000}, shared_call_return=shared_call_return)
+
+            self.assertEqual('($CALL)' in self.instructions, shared_call_return)
+            # the frame of Sys.init starts at 261 and the result took the place of the arguments
+            self.assertEqual(cpu.ram[:5], [262, 261, 256, 3000, 4000])
+            self.assertEqual(cpu.ram[261], 7)
+
+    def test_push_locals(self):
+        ## IT ZEROES THE LOCALS STRAIGHT LINE BELOW THE THRESHOLD AND IN THE SHARED LOOP FROM IT ON
+        garbage = {address: 0x5555 for address in range(256, 1024)}
+
+        for num_locals in [0, 1, 7, 8, 9, 500]:
+            vm_lines = [
+                'function Sys.init 0', 'call Sys.f 0',
+                'function Sys.f {}'.format(num_locals), 'label END', 'goto END'
+            ]
+            cpu = self.run_program(vm_lines, ram=garbage)
+
+            self.assertEqual('($PUSH_LOCALS)' in self.instructions, num_locals >= 8, num_locals)
+            # frames of Sys.init and Sys.f
+            self.assertEqual(cpu.ram[self.LCL], 266)
+            self.assertEqual(cpu.ram[self.SP], 266 + num_locals)
+            self.assertEqual(cpu.ram[266:266 + num_locals], [0] * num_locals)
+            self.assertEqual(cpu.ram[266 + num_locals], 0x5555)
+
+    def test_comparisons(self):
+        ## IT COMPARES THROUGH X - Y ON 16 BITS IN EVERY MODE, THE WAY VMOPTIMIZER FOLDS COMPARISONS
+        operands = [(3, 5), (5, 3), (4, 4), (-2, 7), (-32768, -32768), (32767, -1), (-32768, 1)]
+        pushes = {}
+        for value in {value for pair in operands for value in pair}:
+            if value == -32768:
+                pushes[value] = ['push constant 32767', 'not']
+            elif value < 0:
+                pushes[value] = ['push constant {}'.format(-value), 'neg']
+            else:
+                pushes[value] = ['push constant {}'.format(value)]
+
+        vm_lines = ['function Sys.init 0', 'push constant 8000', 'pop pointer 1']
+        expected = []
+        for operation in ['eq', 'lt', 'gt']:
+            for x, y in operands:
+                vm_lines.extend([*pushes[x], *pushes[y], operation, 'pop that {}'.format(len(expected))])
+                # x - y wraps, i.e., 32767 - -1 = -32768 so 32767 > -1 comes out false
+                difference = (x - y + 32768) % 65536 - 32768
+                result = {'eq': difference == 0, 'lt': difference < 0, 'gt': difference > 0}[operation]
+                expected.append(0xFFFF if result else 0)
+        vm_lines.extend(['label END', 'goto END'])
+
+        for options in self.COMPARISON_MODES:
+            cpu = self.run_program(vm_lines, **options)
+            self.assertEqual(cpu.ram[8000:8000 + len(expected)], expected, options)
+            for routine in ['($EQ)', '($LT)', '($GT)']:
+                self.assertEqual(routine in self.instructions, 'shared_comparisons' in options, routine)
+
+    def test_labels_are_scoped_per_function(self):
+        ## IT JUMPS TO THE LABEL OF THE CURRENT FUNCTION WHEN FUNCTIONS OF A FILE REUSE A LABEL
+        vm_lines = [
+            'function Sys.init 0',
+            'call Sys.count 0', 'pop temp 0',
+            'label LOOP', 'goto LOOP',
+            'function Sys.count 1',
+            'label LOOP',
+            'push local 0', 'push constant 1', 'add', 'pop local 0',
+            'push local 0', 'push constant 3', 'lt', 'if-goto LOOP',
+            'push local 0', 'return'
+        ]
+        cpu = self.run_program(vm_lines)
+
+        self.assertEqual(cpu.ram[5], 3)
+        self.assertIn('(Sys.init$LOOP)', self.instructions)
+        self.assertIn('(Sys.count$LOOP)', self.instructions)
+
+    def test_registered_segment(self):
+        ## IT SPILLS THE CACHED TOP OF THE STACK AND USES THE REGISTERED TRANSLATION FOR SEGMENTS IT DOESN'T KNOW
+        def push_screen(main, command):
+            return ['@{}'.format(16384 + int(command.index())), 'D=M', '@SP', 'AM=M+1', 'A=A-1', 'M=D']
+
+        Main.register_translation('push', push_screen, segment='screen')
+        try:
+            vm_lines = ['function Sys.init 0', 'push constant 5', 'push screen 3', 'add', 'pop temp 0', 'label END', 'goto END']
+            cpu = self.run_program(vm_lines, ram={16387: 37}, cache_stack_top=True)
+        finally:
+            del Main.TRANSLATIONS[('push', 'screen')]
+
+        self.assertEqual(cpu.ram[5], 42)
+        push = self.instructions.index('@16387')
+        self.assertEqual(self.instructions[push - 6:push], ['@5', 'D=A', '@SP', 'AM=M+1', 'A=A-1', 'M=D'])
+
+class TestStackTopCaching(unittest.TestCase):
+    SPILL = ['@SP', 'AM=M+1', 'A=A-1', 'M=D']
+
+    def translate(self, lines):
+        translator = Main(None, cache_stack_top=True)
+        translator.current_file = 'Foo.vm'
+        return [translator._find_translation_for(VMCommand(line)) for line in lines]
+
+    def test_spill(self):
+        ## IT WRITES THE CACHED TOP OF THE STACK BACK BEFORE CONTROL CAN LEAVE STRAIGHT LINE CODE
+        for line in ['label LOOP', 'goto LOOP', 'call Foo.bar 0', 'return']:
+            push, instructions = self.translate(['push constant 5', line])
+            self.assertEqual(push, ['@5', 'D=A'])
+            self.assertEqual(instructions[:4], self.SPILL, line)
+            # nothing is cached afterwards
+            self.assertNotEqual(self.translate(['push constant 5', line, line])[2][:4], self.SPILL, line)
+
+    def test_pop(self):
+        ## IT WALKS A UP FROM THE SEGMENT BASE FOR SMALL INDICES AND GOES THROUGH R13 / R14 BEYOND
+        pop_local_6, pop_this_7 = self.translate(['pop local 6', 'pop this 7'])
+        self.assertEqual(pop_local_6, ['@SP', 'AM=M-1', 'D=M', '@1', 'A=M', *['A=A+1'] * 6, 'M=D'])
+        self.assertIn('@R13', pop_this_7)
+        self.assertNotIn('A=A+1', pop_this_7)
+
+        _, pop_temp_7, _, pop_static_2 = self.translate(['push local 0', 'pop temp 7', 'push local 0', 'pop static 2'])
+        self.assertEqual(pop_temp_7, ['@12', 'M=D'])
+        self.assertEqual(pop_static_2, ['@Foo.2', 'M=D'])
+
+class TestVMTranslatorDriver(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.program_dir = os.path.join(self.output_dir, 'FibonacciElement')
+        shutil.copytree(os.path.join(PROJECT_DIR, 'FunctionCalls', 'FibonacciElement'), self.program_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_translate(self):
+        ## IT PRODUCES THE SAME PROGRAM IN AND OUT OF PROCESS WITH LABELS NAMESPACED PER FILE
+        options = {'shared_call_return': True, 'shared_comparisons': True}
+        instructions = VMTranslatorDriver.translate(self.program_dir, jobs=1, **options)
+
+        self.assertEqual(VMTranslatorDriver.translate(self.program_dir, jobs=2, **options), instructions)
+        # bootstrap, then Main.vm before Sys.vm, then the shared routines
+        self.assertEqual(instructions[:4], ['@256', 'D=A', '@SP', 'M=D'])
+        self.assertLess(instructions.index('(Main.RET_ADDRESS.1)'), instructions.index('(Sys.RET_ADDRESS.1)'))
+        self.assertIn('(RET_ADDRESS.1)', instructions)
+        self.assertEqual(instructions.count('($CALL)'), 1)
+        self.assertEqual(instructions.count('($LT)'), 1)
+
+    def test_eliminate_dead_functions(self):
+        ## IT DROPS FUNCTIONS NOT REACHABLE FROM SYS.INIT AND REPORTS THEM PER CLASS
+        with open(os.path.join(self.program_dir, 'Main.vm'), 'a') as vm_file:
+            vm_file.write('function Main.unused 0\nlabel IF_TRUE\npush constant 1\nreturn\n')
+
+        removed_instructions = {}
+        with mock.patch.object(Main, 'commands_in', autospec=True, side_effect=Main.commands_in) as commands_in:
+            instructions = VMTranslatorDriver.translate(self.program_dir, jobs=1, eliminate_dead_functions=True, removed_instructions=removed_instructions)
+        # the call graph is built from the same parsed commands that are translated
+        self.assertEqual(commands_in.call_count, 2)
+
+        self.assertNotIn('(Main.unused)', instructions)
+        self.assertEqual(list(removed_instructions), ['Main'])
+        self.assertGreater(removed_instructions['Main'], 0)
+        self.assertIn('(Main.unused)', VMTranslatorDriver.translate(self.program_dir, jobs=1))
+
+    def test_labels_are_scoped_per_function(self):
+        ## IT PREFIXES VM LABELS WITH THE ENCLOSING FUNCTION
+        instructions = VMTranslatorDriver.translate(self.program_dir, jobs=1)
+        self.assertIn('(Main.fibonacci$IF_TRUE)', instructions)
+        self.assertIn('(Sys.init$WHILE)', instructions)
+
+    def test_statics_are_named_per_class(self):
+        ## IT NAMES STATICS AFTER THE CLASS FILE WHATEVER THE DIRECTORY IS CALLED OR HOW IT IS REACHED
+        program_dir = os.path.join(self.output_dir, 'Statics.v2')
+        shutil.copytree(os.path.join(PROJECT_DIR, 'FunctionCalls', 'StaticsTest'), program_dir)
+        working_dir = os.getcwd()
+        os.chdir(self.output_dir)
+        try:
+            for path in [program_dir, os.path.join(os.curdir, 'Statics.v2')]:
+                for options in [{}, {'cache_stack_top': True}, {'optimize': True}]:
+                    instructions = VMTranslatorDriver.translate(path, jobs=1, **options)
+                    self.assertIn('@Class1.0', instructions)
+                    self.assertIn('@Class2.1', instructions)
+                    self.assertFalse([instruction for instruction in instructions if instruction.startswith('@.')])
+
+            translator = Main(os.path.join(os.curdir, 'Statics.v2', 'Class1.vm'))
+            instructions = translator.translate_file(translator.input)
+            self.assertIn('@Class1.0', instructions)
+        finally:
+            os.chdir(working_dir)
+
+    def test_run_program(self):
+        ## IT WRITES THE .ASM FILE NEXT TO A SINGLE .VM FILE
+        vm_file_name = os.path.join(self.program_dir, 'Sys.vm')
+        asm_file_name = Main(vm_file_name).run_program()
+
+        self.assertEqual(asm_file_name, os.path.join(self.program_dir, 'Sys.asm'))
+        with open(asm_file_name) as asm_file:
+            self.assertEqual(asm_file.read().splitlines(), VMTranslatorDriver.translate(vm_file_name))
+
+    def test_run_with_errors(self):
+        ## IT LEAVES THE PREVIOUS .ASM FILE ALONE WHEN A .VM FILE DOESN'T TRANSLATE
+        asm_file_name = VMTranslatorDriver.output_file_name(self.program_dir)
+        with open(asm_file_name, 'w') as asm_file:
+            asm_file.write('// previous program\n')
+        with open(os.path.join(self.program_dir, 'Sys.vm'), 'a') as vm_file:
+            vm_file.write('jump LOOP\n')
+
+        with self.assertRaisesRegex(ValueError, 'unknown VM command: jump LOOP'):
+            VMTranslatorDriver.run(self.program_dir)
+        with open(asm_file_name) as asm_file:
+            self.assertEqual(asm_file.read(), '// previous program\n')
+        self.assertFalse(os.path.exists(asm_file_name + VMTranslatorDriver.PARTIAL_FILE_SUFFIX))
+
+    def test_run_to_stream(self):
+        ## IT WRITES THE PROGRAM TO AN OPEN STREAM IN CHUNKS AND LEAVES IT OPEN
+        output = io.StringIO()
+        os.remove(VMTranslatorDriver.output_file_name(self.program_dir))
+        self.assertIs(VMTranslatorDriver.run(self.program_dir, output=output, jobs=1), output)
+        self.assertEqual(output.getvalue().splitlines(), VMTranslatorDriver.translate(self.program_dir, jobs=1))
+        self.assertFalse(os.path.exists(VMTranslatorDriver.output_file_name(self.program_dir)))
+
+    def test_run_to_stream_with_errors(self):
+        ## IT WRITES NOTHING TO THE STREAM WHEN A .VM FILE DOESN'T TRANSLATE
+        output = io.StringIO()
+        with open(os.path.join(self.program_dir, 'Sys.vm'), 'a') as vm_file:
+            vm_file.write('jump LOOP\n')
+
+        for jobs in [1, 2]:
+            with self.assertRaisesRegex(ValueError, 'unknown VM command: jump LOOP'):
+                VMTranslatorDriver.run(self.program_dir, output=output, jobs=jobs)
+            self.assertEqual(output.getvalue(), '')
+            self.assertFalse(output.closed)
+
+if __name__ == '__main__':
+    unittest.main()
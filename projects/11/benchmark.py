@@ -0,0 +1,348 @@
+"""
+Benchmarks for the Jack compiler
+
+usage:
+    python3 benchmark.py tokenizer [.jack files or directories] [--repeat N]
+        tokens per second of the tokenizer on the given sources (default: the Jack programs of projects/09 and
+        projects/12), stepping through them with advance() the way the compilation engine does
+    python3 benchmark.py tokens [.jack files or directories] [--repeat N]
+        memory per token of all tokens of the sources held at once, time per token to construct tokens and
+        to answer the type queries the compilation engine makes
+    python3 benchmark.py compile [.jack files or directories] [--repeat N]
+        time to parse the sources into syntax trees and to generate vm code from the trees (default: the Jack
+        programs of projects/09, projects/11 and projects/12)
+    python3 benchmark.py large [--methods N ...]
+        peak memory of stepping through generated Jack classes of growing size on top of their source text,
+        stays flat as the tokenizer only keeps a fixed window of tokens
+    python3 benchmark.py optimize
+        vm commands emitted for the test programs of this project with and without the syntax tree
+        optimizer, and CPU cycles until halt of those that run without input, translated together with the OS
+        in tools/OS by the projects/08 translator and run on its Hack CPU emulator
+"""
+import os
+import sys
+import glob
+import io
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import importlib.util
+
+PROJECT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(PROJECT_DIR, 'source'))
+
+from JackToken import JackToken
+from JackTokenizer import JackTokenizer
+from JackParser import JackParser
+from CompilationEngine import CompilationEngine
+
+# the toolchain of the previous projects runs the compiled programs
+sys.path.append(os.path.join(PROJECT_DIR, '..', '08'))
+sys.path.append(os.path.join(PROJECT_DIR, '..', '06'))
+
+from VMTranslator import VMTranslatorDriver
+from HackAssembler import HackAssembler
+
+DEFAULT_SOURCE_DIRS = [os.path.join(PROJECT_DIR, '..', '09'), os.path.join(PROJECT_DIR, '..', '12')]
+OS_DIR = os.path.join(PROJECT_DIR, '..', '..', 'tools', 'OS')
+# program -> RAM set before running, None for programs waiting on the keyboard
+TEST_PROGRAMS = {
+    'Seven': {},
+    'ConvertToBin': {8000: 0b1011001110001111},
+    'ComplexArrays': {},
+    'Average': None,
+    'Square': None
+}
+MAX_CYCLES = 50000000
+
+
+def jack_files_in(paths):
+    jack_file_names = []
+    for path in paths:
+        if os.path.isdir(path):
+            jack_file_names.extend(sorted(glob.glob(os.path.join(path, '**', '*.jack'), recursive=True)))
+        else:
+            jack_file_names.append(path)
+
+    return jack_file_names
+
+
+def tokenize(jack_file_name):
+    """
+    returns the number of tokens in the file
+    """
+    with open(jack_file_name) as jack_file:
+        tokenizer = JackTokenizer(jack_file)
+        num_tokens = 0
+        while tokenizer.has_more_tokens:
+            tokenizer.advance()
+            num_tokens += 1
+
+    # the last current token is the empty end of file token
+    return num_tokens - 1
+
+
+def benchmark_tokenizer(jack_file_names, repeat):
+    # group by directory, best of repeat runs per group
+    groups = {}
+    for jack_file_name in jack_file_names:
+        groups.setdefault(os.path.relpath(os.path.dirname(jack_file_name), PROJECT_DIR), []).append(jack_file_name)
+
+    lines = ['{:<32} {:>6} {:>9} {:>10} {:>12}'.format('sources', 'files', 'tokens', 'seconds', 'tokens/s')]
+    total_tokens = 0
+    total_seconds = 0
+    for group, group_file_names in groups.items():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            num_tokens = sum(tokenize(jack_file_name) for jack_file_name in group_file_names)
+            timings.append(time.perf_counter() - start)
+
+        seconds = min(timings)
+        total_tokens += num_tokens
+        total_seconds += seconds
+        lines.append('{:<32} {:>6} {:>9,} {:>10.4f} {:>12,.0f}'.format(
+            group, len(group_file_names), num_tokens, seconds, num_tokens / seconds
+        ))
+
+    lines.append('{:<32} {:>6} {:>9,} {:>10.4f} {:>12,.0f}'.format(
+        'total', len(jack_file_names), total_tokens, total_seconds, total_tokens / total_seconds
+    ))
+    return '\n'.join(lines)
+
+
+def type_queries(token):
+    return (
+        token.token_type(),
+        token.is_identifier(),
+        token.is_keyword(),
+        token.is_string_const(),
+        token.is_operator(),
+        token.is_statement_token()
+    )
+
+
+def benchmark_tokens(jack_file_names, repeat):
+    sources = []
+    for jack_file_name in jack_file_names:
+        with open(jack_file_name) as jack_file:
+            sources.append(jack_file.read())
+
+    # includes the 8 byte list slot of every token
+    tracemalloc.start()
+    tokens = [token for source in sources for token in JackTokenizer.tokens_in(source)]
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    fields = [(token.text, token.line, token.column) for token in tokens]
+    timings = {'construct': [], 'type_queries': []}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text, line, column in fields:
+            JackToken(text, line=line, column=column)
+        timings['construct'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for token in tokens:
+            type_queries(token)
+        timings['type_queries'].append(time.perf_counter() - start)
+
+    lines = [
+        '{} tokens in {} files'.format(len(tokens), len(jack_file_names)),
+        '{:<16} {:>10.1f} bytes/token'.format('memory', memory / len(tokens))
+    ]
+    for phase, phase_timings in timings.items():
+        lines.append('{:<16} {:>10.1f} ns/token'.format(phase, min(phase_timings) / len(tokens) * 1e9))
+
+    return '\n'.join(lines)
+
+
+def benchmark_compile(jack_file_names, repeat):
+    sources = []
+    for jack_file_name in jack_file_names:
+        with open(jack_file_name) as jack_file:
+            sources.append(jack_file.read())
+
+    num_tokens = sum(tokenize_source(source) for source in sources)
+    timings = {'parse': [], 'generate': []}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        class_nodes = [JackParser(JackTokenizer(io.StringIO(source))).parse_class() for source in sources]
+        timings['parse'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for class_node in class_nodes:
+            output_file = io.StringIO()
+            CompilationEngine(None, output_file).compile_class_node(class_node)
+        timings['generate'].append(time.perf_counter() - start)
+
+    lines = ['{} tokens in {} files'.format(num_tokens, len(sources))]
+    for phase, phase_timings in timings.items():
+        seconds = min(phase_timings)
+        lines.append('{:<10} {:>10.4f}s {:>12,.0f} tokens/s'.format(phase, seconds, num_tokens / seconds))
+
+    seconds = sum(min(phase_timings) for phase_timings in timings.values())
+    lines.append('{:<10} {:>10.4f}s {:>12,.0f} tokens/s'.format('total', seconds, num_tokens / seconds))
+    return '\n'.join(lines)
+
+
+def tokenize_source(source):
+    return sum(1 for token in JackTokenizer.tokens_in(source) if token.text)
+
+
+def generated_jack_class(num_methods):
+    """
+    class with num_methods methods full of expressions and calls
+    """
+    lines = ['/** generated */', 'class Generated {', '    field int x, y;']
+    for i in range(num_methods):
+        lines.extend([
+            '    method int method{}(int a, int b) {{'.format(i),
+            '        var Array values;',
+            '        let values = Array.new({});'.format(i % 10 + 1),
+            '        let x = (a + b) * {} - (y / 2); // update x'.format(i),
+            '        let values[0] = Math.max(x, -y);',
+            '        do Output.printString("method {}");'.format(i),
+            '        return values[0] & ~x;',
+            '    }'
+        ])
+    lines.append('}')
+    return '\n'.join(lines)
+
+
+def benchmark_large(num_methods_list):
+    lines = ['{:>8} {:>12} {:>14} {:>10}'.format('methods', 'tokens', 'source KiB', 'peak KiB')]
+    for num_methods in num_methods_list:
+        source = generated_jack_class(num_methods)
+
+        # the source text read by the tokenizer is the only thing growing with the file
+        tokenizer = JackTokenizer(io.StringIO(source))
+        tracemalloc.start()
+        num_tokens = 0
+        while tokenizer.has_more_tokens:
+            tokenizer.advance()
+            num_tokens += 1
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        lines.append('{:>8,} {:>12,} {:>14,.0f} {:>10,.1f}'.format(
+            num_methods, num_tokens - 1, sys.getsizeof(source) / 1024, peak / 1024
+        ))
+
+    return '\n'.join(lines)
+
+
+def load_hack_cpu():
+    """
+    the emulator lives in the benchmarks of projects/08, loaded under another name than this module
+    """
+    spec = importlib.util.spec_from_file_location('vm_benchmark', os.path.join(PROJECT_DIR, '..', '08', 'benchmark.py'))
+    vm_benchmark = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(vm_benchmark)
+    return vm_benchmark.HackCPU
+
+
+def compile_program(program, optimize):
+    """
+    returns the vm code of each class of the program
+    """
+    vm_code = {}
+    for jack_file_name in jack_files_in([os.path.join(PROJECT_DIR, program)]):
+        output_file = io.StringIO()
+        with open(jack_file_name) as jack_file:
+            CompilationEngine(JackTokenizer(jack_file), output_file, optimize=optimize).compile_class()
+        vm_code[os.path.basename(jack_file_name)[:-len('.jack')]] = output_file.getvalue()
+
+    return vm_code
+
+
+def run_program(hack_cpu, vm_code, ram):
+    """
+    cycles until Sys.halt and the RAM at that point
+    """
+    directory = tempfile.mkdtemp()
+    try:
+        for vm_file_name in glob.glob(os.path.join(OS_DIR, '*.vm')):
+            shutil.copy(vm_file_name, directory)
+        for class_name, code in vm_code.items():
+            with open(os.path.join(directory, class_name + '.vm'), 'w') as vm_file:
+                vm_file.write(code)
+
+        # all of the OS doesn't fit in the ROM, only what the program calls is kept
+        assembly_lines = VMTranslatorDriver.translate(
+            directory, jobs=1, eliminate_dead_functions=True, optimize=True, cache_stack_top=True,
+            shared_call_return=True, shared_comparisons=True
+        )
+    finally:
+        shutil.rmtree(directory)
+
+    cpu = hack_cpu(HackAssembler.assemble_lines(assembly_lines), ram)
+    cycles = cpu.run(MAX_CYCLES)
+    if not cpu.halted():
+        raise RuntimeError('program didn\'t halt within {} cycles'.format(MAX_CYCLES))
+
+    return cycles, cpu.ram
+
+
+def benchmark_optimize():
+    hack_cpu = load_hack_cpu()
+    lines = ['{:<14} {:>8} {:>10} {:>8} {:>12} {:>12} {:>8} {:>5}'.format(
+        'program', 'vm', 'vm -O', 'change', 'cycles', 'cycles -O', 'change', 'same'
+    )]
+
+    for program, ram in TEST_PROGRAMS.items():
+        vm_code = compile_program(program, optimize=False)
+        optimized_vm_code = compile_program(program, optimize=True)
+        num_commands = sum(len(code.splitlines()) for code in vm_code.values())
+        optimized_num_commands = sum(len(code.splitlines()) for code in optimized_vm_code.values())
+        line = '{:<14} {:>8,} {:>10,} {:>+8,}'.format(
+            program, num_commands, optimized_num_commands, optimized_num_commands - num_commands
+        )
+
+        if ram is not None:
+            cycles, final_ram = run_program(hack_cpu, vm_code, ram)
+            optimized_cycles, optimized_final_ram = run_program(hack_cpu, optimized_vm_code, ram)
+            # results and screen, the stack and heap may be laid out differently
+            same = final_ram[8000:] == optimized_final_ram[8000:]
+            line += ' {:>12,} {:>12,} {:>+8,} {:>5}'.format(
+                cycles, optimized_cycles, optimized_cycles - cycles, 'yes' if same else 'NO'
+            )
+
+        lines.append(line)
+
+    return '\n'.join(lines)
+
+
+def main(argv):
+    argument_parser = argparse.ArgumentParser(description='Jack compiler benchmarks')
+    subparsers = argument_parser.add_subparsers(dest='benchmark', required=True)
+    tokenizer_parser = subparsers.add_parser('tokenizer', help='tokenizer throughput on Jack sources')
+    tokenizer_parser.add_argument('paths', nargs='*', help='.jack files or directories (default: projects/09 and projects/12)')
+    tokenizer_parser.add_argument('--repeat', type=int, default=5, help='runs per group of files, best time is kept')
+    tokens_parser = subparsers.add_parser('tokens', help='memory and time per token')
+    tokens_parser.add_argument('paths', nargs='*', help='.jack files or directories (default: projects/09 and projects/12)')
+    tokens_parser.add_argument('--repeat', type=int, default=5, help='best time is kept')
+    compile_parser = subparsers.add_parser('compile', help='parse and code generation time')
+    compile_parser.add_argument('paths', nargs='*', help='.jack files or directories (default: projects/09, projects/11 and projects/12)')
+    compile_parser.add_argument('--repeat', type=int, default=5, help='best time is kept')
+    large_parser = subparsers.add_parser('large', help='memory of tokenizing growing generated classes')
+    large_parser.add_argument('--methods', type=int, nargs='+', default=[100, 1000, 10000])
+    subparsers.add_parser('optimize', help='vm size and cycles with and without the syntax tree optimizer')
+    arguments = argument_parser.parse_args(argv)
+
+    if arguments.benchmark == 'tokenizer':
+        print(benchmark_tokenizer(jack_files_in(arguments.paths or DEFAULT_SOURCE_DIRS), arguments.repeat))
+    elif arguments.benchmark == 'tokens':
+        print(benchmark_tokens(jack_files_in(arguments.paths or DEFAULT_SOURCE_DIRS), arguments.repeat))
+    elif arguments.benchmark == 'compile':
+        print(benchmark_compile(jack_files_in(arguments.paths or DEFAULT_SOURCE_DIRS + [PROJECT_DIR]), arguments.repeat))
+    elif arguments.benchmark == 'large':
+        print(benchmark_large(arguments.methods))
+    elif arguments.benchmark == 'optimize':
+        print(benchmark_optimize())
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
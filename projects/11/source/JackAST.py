@@ -0,0 +1,139 @@
+class JackNode():
+    """
+    base of all syntax tree nodes
+    nodes are plain records, one slot per child or attribute and no per instance __dict__
+    """
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self):
+        return '{}({})'.format(
+            type(self).__name__, ', '.join(repr(getattr(self, name)) for name in self.__slots__)
+        )
+
+# program structure
+
+class ClassNode(JackNode):
+    """
+    class name { class_var_decs subroutines }
+    """
+    __slots__ = ('name', 'class_var_decs', 'subroutines')
+
+class ClassVarDec(JackNode):
+    """
+    (static | field) type name (, name)* ;
+    """
+    __slots__ = ('kind', 'type', 'names')
+
+class Subroutine(JackNode):
+    """
+    (constructor | function | method) return_type name ( parameters ) { var_decs statements }
+    parameters: list of (type, name)
+    """
+    __slots__ = ('kind', 'return_type', 'name', 'parameters', 'var_decs', 'statements')
+
+class VarDec(JackNode):
+    """
+    var type name (, name)* ;
+    """
+    __slots__ = ('type', 'names')
+
+# statements
+
+class LetStatement(JackNode):
+    """
+    let name ([ index ])? = value ;
+    index is None unless an array element is assigned
+    """
+    __slots__ = ('name', 'index', 'value')
+
+class IfStatement(JackNode):
+    """
+    if ( condition ) { statements } (else { else_statements })?
+    else_statements is None without an else branch
+    """
+    __slots__ = ('condition', 'statements', 'else_statements')
+
+class WhileStatement(JackNode):
+    """
+    while ( condition ) { statements }
+    """
+    __slots__ = ('condition', 'statements')
+
+class DoStatement(JackNode):
+    """
+    do call ;
+    """
+    __slots__ = ('call',)
+
+class ReturnStatement(JackNode):
+    """
+    return value? ;
+    value is None for void subroutines
+    """
+    __slots__ = ('value',)
+
+# expressions
+
+class BinaryOp(JackNode):
+    """
+    left op right, Jack has no precedence so a + b * c is (a + b) * c
+    """
+    __slots__ = ('op', 'left', 'right')
+
+class UnaryOp(JackNode):
+    """
+    - operand or ~ operand
+    """
+    __slots__ = ('op', 'operand')
+
+class IntegerConstant(JackNode):
+    """
+    0..32767
+    """
+    __slots__ = ('value',)
+
+class StringConstant(JackNode):
+    """
+    "value", without the quotes
+    """
+    __slots__ = ('value',)
+
+class KeywordConstant(JackNode):
+    """
+    true, false, null or this
+    """
+    __slots__ = ('keyword',)
+
+class VariableReference(JackNode):
+    """
+    name
+    """
+    __slots__ = ('name',)
+
+class ArrayReference(JackNode):
+    """
+    name [ index ]
+    """
+    __slots__ = ('name', 'index')
+
+class SubroutineCall(JackNode):
+    """
+    name ( arguments ) or receiver . name ( arguments )
+    receiver is None, a variable or a class name
+    """
+    __slots__ = ('receiver', 'name', 'arguments')
+
+class ShiftLeft(JackNode):
+    """
+    operand doubled shift times, what the optimizer turns operand * 2^shift into
+    """
+    __slots__ = ('operand', 'shift')
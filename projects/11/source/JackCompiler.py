@@ -6,9 +6,9 @@ import glob
 
 class JackCompiler():
     @classmethod
-    def run(cls, input_file, output_file):
+    def run(cls, input_file, output_file, optimize=False):
         tokenizer = JackTokenizer(input_file)
-        compiler = CompilationEngine(tokenizer, output_file)
+        compiler = CompilationEngine(tokenizer, output_file, optimize=optimize)
         compiler.compile_class()
 
     @classmethod
@@ -26,8 +26,14 @@ class JackCompiler():
         # actual format expected for Coursera grader
         # return dir_name + "/" + file_name + ext_name
 
-if __name__ == "__main__" and len(sys.argv) == 2:
+if __name__ == "__main__":
+    # python JackCompiler.py Foo.jack -O folds constants and avoids Math.multiply where it can
+    if len(sys.argv) < 2 or sys.argv[2:] not in ([], ['-O']):
+        print('usage: python JackCompiler.py Foo.jack|directory [-O]', file=sys.stderr)
+        sys.exit(2)
+
     arg = sys.argv[1]
+    optimize = sys.argv[2:] == ['-O']
 
     # determine output file names
     if os.path.isfile(arg):
@@ -46,4 +52,4 @@ if __name__ == "__main__" and len(sys.argv) == 2:
         output_file_name = JackCompiler.output_file_for(input_file_name)
         output_file = open(output_file_name, 'w')
         input_file = open(input_file_name, 'r')
-        JackCompiler.run(input_file, output_file)
+        JackCompiler.run(input_file, output_file, optimize=optimize)
@@ -0,0 +1,236 @@
+from JackAST import (
+    LetStatement, IfStatement, WhileStatement, DoStatement, ReturnStatement,
+    BinaryOp, UnaryOp, IntegerConstant, KeywordConstant, VariableReference, ArrayReference,
+    SubroutineCall, ShiftLeft
+)
+
+class JackOptimizer():
+    """
+    optimization pass over the syntax tree of a class, runs between the parser and code generation
+    expressions are rewritten bottom up so folded operands take part in folding their parent,
+    i.e., 1 + (2 * 3) -> 7
+    arithmetic is folded on 16 bits like the vm does it, Math.multiply keeps the low 16 bits as well
+    """
+    MAX_CONSTANT = 32767
+    MIN_VALUE = -32768
+    KEYWORD_VALUES = {
+        'true': -1,
+        'false': 0,
+        'null': 0
+    }
+    ARITHMETIC_OPERATORS = {
+        '+': lambda x, y: x + y,
+        '-': lambda x, y: x - y,
+        '*': lambda x, y: x * y,
+        '&': lambda x, y: x & y,
+        '|': lambda x, y: x | y
+    }
+    COMPARISON_OPERATORS = {
+        '<': lambda x, y: x < y,
+        '>': lambda x, y: x > y,
+        '=': lambda x, y: x == y
+    }
+
+    def __init__(self):
+        # rule -> number of times applied
+        self.rewrites = {
+            'constant_folding': 0,
+            'algebraic_identity': 0,
+            'double_negation': 0,
+            'strength_reduction': 0
+        }
+        self.statement_optimizers = {
+            LetStatement: self.optimize_let,
+            IfStatement: self.optimize_if,
+            WhileStatement: self.optimize_while,
+            DoStatement: self.optimize_do,
+            ReturnStatement: self.optimize_return
+        }
+
+    def optimize_class(self, class_node):
+        for subroutine in class_node.subroutines:
+            self.optimize_statements(subroutine.statements)
+
+        return class_node
+
+    def optimize_statements(self, statements):
+        for statement in statements:
+            self.statement_optimizers[type(statement)](statement)
+
+    def optimize_let(self, statement):
+        if statement.index is not None:
+            statement.index = self.optimize_expression(statement.index)
+        statement.value = self.optimize_expression(statement.value)
+
+    def optimize_if(self, statement):
+        statement.condition = self.optimize_expression(statement.condition)
+        self.optimize_statements(statement.statements)
+        if statement.else_statements is not None:
+            self.optimize_statements(statement.else_statements)
+
+    def optimize_while(self, statement):
+        statement.condition = self.optimize_expression(statement.condition)
+        self.optimize_statements(statement.statements)
+
+    def optimize_do(self, statement):
+        statement.call = self.optimize_expression(statement.call)
+
+    def optimize_return(self, statement):
+        if statement.value is not None:
+            statement.value = self.optimize_expression(statement.value)
+
+    def optimize_expression(self, expression):
+        """
+        returns the rewritten expression, children are rewritten in place
+        """
+        expression_type = type(expression)
+
+        if expression_type is BinaryOp:
+            expression.left = self.optimize_expression(expression.left)
+            expression.right = self.optimize_expression(expression.right)
+            return self._rewrite_binary(expression)
+        elif expression_type is UnaryOp:
+            expression.operand = self.optimize_expression(expression.operand)
+            return self._rewrite_unary(expression)
+        elif expression_type is ArrayReference:
+            expression.index = self.optimize_expression(expression.index)
+        elif expression_type is SubroutineCall:
+            expression.arguments = [self.optimize_expression(argument) for argument in expression.arguments]
+
+        return expression
+
+    def _rewrite_binary(self, expression):
+        op = expression.op
+        x = self.constant_value(expression.left)
+        y = self.constant_value(expression.right)
+
+        if x is not None and y is not None:
+            value = self._fold(op, x, y)
+            if value is not None:
+                self.rewrites['constant_folding'] += 1
+                return self.constant_node(value)
+
+        # x + 0, 0 + x, x - 0, x | 0, 0 | x, x / 1
+        if (op == '+' or op == '|') and x == 0:
+            self.rewrites['algebraic_identity'] += 1
+            return expression.right
+        elif (op == '+' or op == '-' or op == '|') and y == 0:
+            self.rewrites['algebraic_identity'] += 1
+            return expression.left
+        elif op == '/' and y == 1:
+            self.rewrites['algebraic_identity'] += 1
+            return expression.left
+        elif op == '*':
+            for constant, operand in [(y, expression.left), (x, expression.right)]:
+                if constant is not None:
+                    return self._rewrite_multiplication(expression, operand, constant)
+
+        return expression
+
+    def _rewrite_multiplication(self, expression, operand, constant):
+        """
+        operand * constant without calling Math.multiply where possible
+        """
+        if constant == 1:
+            self.rewrites['algebraic_identity'] += 1
+            return operand
+        elif constant == 0 and self.is_pure(operand):
+            # the operand is only dropped when evaluating it has no effect
+            self.rewrites['algebraic_identity'] += 1
+            return IntegerConstant(0)
+        elif constant > 1 and constant & (constant - 1) == 0:
+            self.rewrites['strength_reduction'] += 1
+            shift = constant.bit_length() - 1
+            if shift == 1 and type(operand) is VariableReference:
+                return BinaryOp('+', operand, operand)
+            return ShiftLeft(operand, shift)
+
+        return expression
+
+    def _rewrite_unary(self, expression):
+        operand = expression.operand
+        value = self.constant_value(operand)
+
+        if value is not None:
+            folded = self.constant_node(-value if expression.op == '-' else ~value)
+            # -5 is already as small as it gets
+            if folded != expression:
+                self.rewrites['constant_folding'] += 1
+            return folded
+        elif type(operand) is UnaryOp and operand.op == expression.op:
+            # ~~x and --x
+            self.rewrites['double_negation'] += 1
+            return operand.operand
+
+        return expression
+
+    def _fold(self, op, x, y):
+        """
+        value of x op y, None if it can't be worked out safely at compile time
+        """
+        if op in self.ARITHMETIC_OPERATORS:
+            return self.ARITHMETIC_OPERATORS[op](x, y)
+        elif op in self.COMPARISON_OPERATORS:
+            # the translated code compares through x - y, only fold where that doesn't overflow
+            if not self.MIN_VALUE <= x - y <= self.MAX_CONSTANT:
+                return None
+            return -1 if self.COMPARISON_OPERATORS[op](x, y) else 0
+        elif op == '/':
+            # division by 0 is a runtime error and -32768 has no positive counterpart
+            if y == 0 or x == self.MIN_VALUE or y == self.MIN_VALUE:
+                return None
+            # Math.divide truncates towards 0
+            quotient = abs(x) // abs(y)
+            return quotient if (x < 0) == (y < 0) else -quotient
+
+    @classmethod
+    def constant_value(cls, expression):
+        """
+        16 bit signed value of a constant expression, None for anything else
+        """
+        expression_type = type(expression)
+
+        if expression_type is IntegerConstant:
+            return expression.value
+        elif expression_type is KeywordConstant:
+            return cls.KEYWORD_VALUES.get(expression.keyword)
+        elif expression_type is UnaryOp:
+            value = cls.constant_value(expression.operand)
+            if value is not None:
+                return cls.to_word(-value if expression.op == '-' else ~value)
+
+    @classmethod
+    def constant_node(cls, value):
+        """
+        smallest expression for value, constants in Jack are 0..32767
+        """
+        value = cls.to_word(value)
+        if value >= 0:
+            return IntegerConstant(value)
+        elif value == cls.MIN_VALUE:
+            return UnaryOp('~', IntegerConstant(cls.MAX_CONSTANT))
+        else:
+            return UnaryOp('-', IntegerConstant(-value))
+
+    @classmethod
+    def to_word(cls, value):
+        # wrap to 16 bit two's complement
+        return (value - cls.MIN_VALUE) % 0x10000 + cls.MIN_VALUE
+
+    @classmethod
+    def is_pure(cls, expression):
+        """
+        no calls, divisions are calls that may fail, multiplications are not
+        """
+        expression_type = type(expression)
+
+        if expression_type is BinaryOp:
+            return expression.op != '/' and cls.is_pure(expression.left) and cls.is_pure(expression.right)
+        elif expression_type is UnaryOp:
+            return cls.is_pure(expression.operand)
+        elif expression_type is ArrayReference:
+            return cls.is_pure(expression.index)
+        elif expression_type is ShiftLeft:
+            return cls.is_pure(expression.operand)
+
+        return expression_type is not SubroutineCall
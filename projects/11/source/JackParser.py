@@ -0,0 +1,271 @@
+from JackAST import (
+    ClassNode, ClassVarDec, Subroutine, VarDec,
+    LetStatement, IfStatement, WhileStatement, DoStatement, ReturnStatement,
+    BinaryOp, UnaryOp, IntegerConstant, StringConstant, KeywordConstant,
+    VariableReference, ArrayReference, SubroutineCall
+)
+
+class JackParser():
+    """
+    recursive descent parser building the syntax tree of a class from a jack tokenizer in one pass
+    one parse_ method per grammar rule, each starts on the first token of its rule
+    and leaves the tokenizer on the first token after it
+    raises ValueError with the position of the first token that doesn't fit the grammar
+    """
+    CLASS_VAR_DEC_KEYWORDS = frozenset(['static', 'field'])
+    SUBROUTINE_KEYWORDS = frozenset(['constructor', 'function', 'method'])
+    OPERATORS = frozenset(['+', '-', '*', '/', '&', '|', '<', '>', '='])
+    UNARY_OPERATORS = frozenset(['-', '~'])
+    KEYWORD_CONSTANTS = frozenset(['true', 'false', 'null', 'this'])
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.statement_parsers = {
+            'let': self.parse_let,
+            'if': self.parse_if,
+            'while': self.parse_while,
+            'do': self.parse_do,
+            'return': self.parse_return
+        }
+
+    # 'class' className '{' classVarDec* subroutineDec* '}'
+    def parse_class(self):
+        self.tokenizer.advance()
+        self._expect('class')
+        name = self._expect_identifier()
+        self._expect('{')
+
+        class_var_decs = []
+        while self._current_text() in self.CLASS_VAR_DEC_KEYWORDS:
+            class_var_decs.append(self.parse_class_var_dec())
+
+        subroutines = []
+        while self._current_text() in self.SUBROUTINE_KEYWORDS:
+            subroutines.append(self.parse_subroutine())
+
+        self._expect('}')
+        return ClassNode(name, class_var_decs, subroutines)
+
+    # ('static' | 'field') type varName (',' varName)* ';'
+    def parse_class_var_dec(self):
+        kind = self._advance_text()
+        symbol_type = self._advance_text()
+        return ClassVarDec(kind, symbol_type, self._parse_names())
+
+    # ('constructor' | 'function' | 'method') ('void' | type) subroutineName '(' parameterList ')' subroutineBody
+    def parse_subroutine(self):
+        kind = self._advance_text()
+        return_type = self._advance_text()
+        name = self._expect_identifier()
+
+        self._expect('(')
+        parameters = self.parse_parameter_list()
+        self._expect(')')
+
+        self._expect('{')
+        var_decs = []
+        while self._current_text() == 'var':
+            var_decs.append(self.parse_var_dec())
+        statements = self.parse_statements()
+        self._expect('}')
+
+        return Subroutine(kind, return_type, name, parameters, var_decs, statements)
+
+    # ((type varName) (',' type varName)*)?
+    def parse_parameter_list(self):
+        parameters = []
+        while self._current_text() != ')':
+            if parameters:
+                self._expect(',')
+            symbol_type = self._advance_text()
+            parameters.append((symbol_type, self._expect_identifier()))
+
+        return parameters
+
+    # 'var' type varName (',' varName)* ';'
+    def parse_var_dec(self):
+        self._expect('var')
+        symbol_type = self._advance_text()
+        return VarDec(symbol_type, self._parse_names())
+
+    # statement*
+    def parse_statements(self):
+        statements = []
+        statement_parser = self.statement_parsers.get(self._current_text())
+        while statement_parser:
+            statements.append(statement_parser())
+            statement_parser = self.statement_parsers.get(self._current_text())
+
+        return statements
+
+    # 'let' varName ('[' expression ']')? '=' expression ';'
+    def parse_let(self):
+        self._expect('let')
+        name = self._expect_identifier()
+
+        index = None
+        if self._current_text() == '[':
+            self.tokenizer.advance()
+            index = self.parse_expression()
+            self._expect(']')
+
+        self._expect('=')
+        value = self.parse_expression()
+        self._expect(';')
+        return LetStatement(name, index, value)
+
+    # 'if' '(' expression ')' '{' statements '}' ('else' '{' statements '}')?
+    def parse_if(self):
+        self._expect('if')
+        condition = self._parse_condition()
+        statements = self._parse_block()
+
+        else_statements = None
+        if self._current_text() == 'else':
+            self.tokenizer.advance()
+            else_statements = self._parse_block()
+
+        return IfStatement(condition, statements, else_statements)
+
+    # 'while' '(' expression ')' '{' statements '}'
+    def parse_while(self):
+        self._expect('while')
+        condition = self._parse_condition()
+        return WhileStatement(condition, self._parse_block())
+
+    # 'do' subroutineCall ';'
+    def parse_do(self):
+        self._expect('do')
+        name = self._expect_identifier()
+        call = self._parse_subroutine_call(name)
+        self._expect(';')
+        return DoStatement(call)
+
+    # 'return' expression? ';'
+    def parse_return(self):
+        self._expect('return')
+        value = None
+        if self._current_text() != ';':
+            value = self.parse_expression()
+
+        self._expect(';')
+        return ReturnStatement(value)
+
+    # term (op term)*
+    def parse_expression(self):
+        expression = self.parse_term()
+        # no precedence in Jack, operators apply left to right
+        while self._current_text() in self.OPERATORS:
+            op = self._advance_text()
+            expression = BinaryOp(op, expression, self.parse_term())
+
+        return expression
+
+    # integerConstant | stringConstant | keywordConstant | varName | varName '[' expression ']' |
+    # subroutineCall | '(' expression ')' | unaryOp term
+    def parse_term(self):
+        token = self.tokenizer.current_token
+        token_type = token.type
+
+        if token_type == 'INT_CONST':
+            self.tokenizer.advance()
+            return IntegerConstant(int(token.text))
+        elif token_type == 'STRING_CONST':
+            self.tokenizer.advance()
+            return StringConstant(token.text[1:-1])
+        elif token.text in self.KEYWORD_CONSTANTS:
+            self.tokenizer.advance()
+            return KeywordConstant(token.text)
+        elif token.text == '(':
+            self.tokenizer.advance()
+            expression = self.parse_expression()
+            self._expect(')')
+            return expression
+        elif token.text in self.UNARY_OPERATORS:
+            self.tokenizer.advance()
+            return UnaryOp(token.text, self.parse_term())
+        elif token_type == 'IDENTIFIER':
+            name = self._expect_identifier()
+            if self._current_text() == '[':
+                self.tokenizer.advance()
+                index = self.parse_expression()
+                self._expect(']')
+                return ArrayReference(name, index)
+            elif self._current_text() in ('(', '.'):
+                return self._parse_subroutine_call(name)
+            else:
+                return VariableReference(name)
+
+        self._error('expression')
+
+    # (expression (',' expression)*)?
+    def parse_expression_list(self):
+        expressions = []
+        while self._current_text() != ')':
+            if expressions:
+                self._expect(',')
+            expressions.append(self.parse_expression())
+
+        return expressions
+
+    # subroutineName '(' expressionList ')' | (className | varName) '.' subroutineName '(' expressionList ')'
+    # starting after the first name
+    def _parse_subroutine_call(self, name):
+        receiver = None
+        if self._current_text() == '.':
+            self.tokenizer.advance()
+            receiver = name
+            name = self._expect_identifier()
+
+        self._expect('(')
+        arguments = self.parse_expression_list()
+        self._expect(')')
+        return SubroutineCall(receiver, name, arguments)
+
+    def _parse_condition(self):
+        self._expect('(')
+        condition = self.parse_expression()
+        self._expect(')')
+        return condition
+
+    def _parse_block(self):
+        self._expect('{')
+        statements = self.parse_statements()
+        self._expect('}')
+        return statements
+
+    def _parse_names(self):
+        """
+        varName (',' varName)* ';'
+        """
+        names = [self._expect_identifier()]
+        while self._current_text() == ',':
+            self.tokenizer.advance()
+            names.append(self._expect_identifier())
+
+        self._expect(';')
+        return names
+
+    def _current_text(self):
+        return self.tokenizer.current_token.text
+
+    def _advance_text(self):
+        text = self.tokenizer.current_token.text
+        self.tokenizer.advance()
+        return text
+
+    def _expect(self, text):
+        if self.tokenizer.current_token.text != text:
+            self._error("'{}'".format(text))
+        self.tokenizer.advance()
+
+    def _expect_identifier(self):
+        if not self.tokenizer.current_token.is_identifier():
+            self._error('identifier')
+        return self._advance_text()
+
+    def _error(self, expected):
+        token = self.tokenizer.current_token
+        raise ValueError('expected {} but found {!r} at line {} column {}'.format(
+            expected, token.text or 'end of file', token.line, token.column
+        ))
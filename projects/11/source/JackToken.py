@@ -1,5 +1,7 @@
+import sys
+
 class JackToken():
-    KEYWORD_TOKENS = [
+    KEYWORD_TOKENS = frozenset([
         'class',
         'constructor',
         'function',
@@ -21,11 +23,10 @@ class JackToken():
         'else',
         'while',
         'return'
-    ]
-    CLASS_VAR_DEC_TOKENS = [ 'static', 'field' ]
-    SUBROUTINE_TOKENS = [ 'function', 'method', 'constructor' ]
-    STATEMENT_TOKENS = [ 'do', 'let', 'while', 'return', 'if' ]
-    OPERATORS = [
+    ])
+    SYMBOL_TOKENS = frozenset('{}()[].,;+-*/&|<>=~')
+    STATEMENT_TOKENS = frozenset([ 'do', 'let', 'while', 'return', 'if' ])
+    OPERATORS = frozenset([
         '+',
         '-',
         '*',
@@ -35,71 +36,68 @@ class JackToken():
         '<',
         '>',
         '='
-    ]
-    UNARY_OPERATORS = [ '-', '~' ]
-    TOKENS_THAT_NEED_LABELS = ['if', 'while']
+    ])
+    BOOLEAN_TOKENS = frozenset([ 'true', 'false' ])
+    # types of all fixed tokens, anything else is a constant or an identifier
+    TOKEN_TYPES = {
+        **dict.fromkeys(KEYWORD_TOKENS, 'KEYWORD'),
+        **dict.fromkeys(SYMBOL_TOKENS, 'SYMBOL')
+    }
+
+    # one token per lexical element of a file, no per instance __dict__
+    __slots__ = ('text', 'type', 'line', 'column')
+
+    def __init__(self, text, line=None, column=None):
+        # computed once, the compilation engine asks for it many times per token
+        token_type = self.TOKEN_TYPES.get(text)
+        if token_type is None and text:
+            first_char = text[0]
+            if first_char == "\"":
+                token_type = "STRING_CONST"
+            elif first_char.isdigit():
+                token_type = "INT_CONST"
+            elif first_char.isalpha() or first_char == "_":
+                token_type = "IDENTIFIER"
+            else:
+                token_type = "SYMBOL"
+
+        # identifiers and keywords repeat a lot, interning shares one string between all of them
+        # constants are left alone so unique strings don't pile up in the interned table
+        if token_type == "IDENTIFIER" or token_type == "KEYWORD":
+            text = sys.intern(text)
 
-    def __init__(self, text):
         self.text = text
+        self.type = token_type
+        # position in the source file, both 1-based
+        self.line = line
+        self.column = column
 
     def token_type(self):
-        if not self.text:
-            return None
-        elif self.text[0] == "\"":
-            return "STRING_CONST"
-        elif self.text in self.KEYWORD_TOKENS:
-            return "KEYWORD"
-        elif self.text.isnumeric():
-            return "INT_CONST"
-        elif self.text.isalnum():
-            return "IDENTIFIER"
-        else:
-            return "SYMBOL"
-
-    def is_expression_list_delimiter(self):
-        return self.text == ','
-
-    def is_expression_list_starter(self):
-        return self.text == '('
-
-    def is_subroutine_call_delimiter(self):
-        return self.text == '.'
-
-    def is_unary_operator(self):
-        return self.text in self.UNARY_OPERATORS
+        return self.type
 
     def is_operator(self):
         return self.text in self.OPERATORS
 
-    def is_if(self):
-        return self.text == 'if'
-
     def is_statement_token(self):
         return self.text in self.STATEMENT_TOKENS
 
-    def starts_class_var_dec(self):
-        return self.text in self.CLASS_VAR_DEC_TOKENS
-
-    def starts_subroutine(self):
-        return self.text in self.SUBROUTINE_TOKENS
-
     def is_class(self):
         return self.text == "class"
 
     def is_string_const(self):
-        return self.token_type() == "STRING_CONST"
+        return self.type == "STRING_CONST"
 
     def is_identifier(self):
-        return self.token_type() == "IDENTIFIER"
+        return self.type == "IDENTIFIER"
 
     def is_keyword(self):
-        return self.token_type() == "KEYWORD"
+        return self.type == "KEYWORD"
 
     def is_boolean(self):
-        return self.text in ['true', 'false']
+        return self.text in self.BOOLEAN_TOKENS
 
     def is_null(self):
         return self.text == 'null'
 
     def is_empty(self):
-        return len(self.text) == 0
+        return not self.text
@@ -1,43 +1,81 @@
+import re
+
 from JackToken import JackToken
 
 class JackTokenizer():
-    COMMENT_OPERATORS = ["/", "*"]
     STRING_CONST_DELIMITER = '"'
+    # whitespace and comments in front of a token are skipped as part of the same match
+    # so every match is one token, the end of the source matches as an empty token
+    TOKEN_PATTERN = re.compile(r'''
+        (?:\s+|//[^\n]*|/\*.*?\*/)*
+        (?:
+            (?P<string_const>"[^"\n]*")
+          | (?P<int_const>\d+)
+          | (?P<word>[A-Za-z_]\w*)
+          | (?P<unterminated>/\*|")
+          | (?P<symbol>[{}()\[\].,;+\-*/&|<>=~])
+          | (?P<error>.)
+          | (?P<end>\Z)
+        )
+    ''', re.VERBOSE | re.DOTALL)
+    ERROR_GROUPS = frozenset(['unterminated', 'error'])
 
     """
     goes through a .jack input file and produces a stream of tokens
     ignores all whitespace and comments
+    the whole file is read at once and scanned with a single regex, tokens know their line and column
+    only the current and next tokens are kept, the rest are read from the source as the parser advances
     """
     def __init__(self, input_file):
         self.input_file = input_file
-        self.tokens_found = []
+        self.source = input_file.read()
+        self.token_stream = self.tokens_in(self.source)
+        self.last_token_read = None
         self.current_token = None
         self.next_token = None
         self.has_more_tokens = True
 
+    @classmethod
+    def tokens_in(cls, source):
+        """
+        yields the tokens of source followed by an empty token marking the end of the file
+        raises ValueError on characters, strings or comments that can't be tokenized
+        """
+        line = 1
+        line_start = 0
+        position = 0
+
+        for match in cls.TOKEN_PATTERN.finditer(source):
+            kind = match.lastgroup
+            start = match.start(kind)
+
+            # count the lines of the whitespace and comments skipped since the last token
+            newlines = source.count('\n', position, start)
+            if newlines:
+                line += newlines
+                line_start = source.rfind('\n', position, start) + 1
+            position = match.end()
+
+            if kind in cls.ERROR_GROUPS:
+                raise ValueError('unexpected {!r} at line {} column {}'.format(
+                    source[start:start + 2], line, start - line_start + 1
+                ))
+
+            yield JackToken(match[kind], line=line, column=start - line_start + 1)
+
+            if kind == 'end':
+                return
+
     def advance(self):
-        # initialize char
-        char = self.input_file.read(1)
-        # skip whitespace and comments
-        char = self._skip_whitespace_and_comments(starting_char=char)
-
-        # get token
-        if self._is_string_const_delimeter(char):
-            token = JackToken(self._get_string_const(starting_char=char))
-        elif char.isalnum():
-            token = JackToken(self._get_alnum_underscore(starting_char=char))
-        else: # symbol
-            token = JackToken(char)
+        token = self._read_token()
 
         # set tokens
         if self.current_token:
             self.current_token = self.next_token
             self.next_token = token
-            self.tokens_found.append(token)
         else: # initial setup
             self.current_token = token
             self.next_token = token
-            self.tokens_found.append(token)
             # get next token
             self.advance()
 
@@ -71,86 +109,7 @@ class JackTokenizer():
             # remove " that denote string const
             return self.current_token.text.replace('"', '')
 
-    def part_of_expression_list(self):
-        if len(self.tokens_found) < 3:
-            return False
-
-        past_token = self.tokens_found[-3]
-        return past_token.is_expression_list_delimiter() or past_token.is_expression_list_starter()
-
-    def _get_alnum_underscore(self, starting_char):
-        token = ''
-        char = starting_char
-        # get rest of token
-        while self._is_alnum_or_underscore(char):
-            # keep track of what was last read
-            last_pos = self.input_file.tell()
-            token += char
-            char = self.input_file.read(1)
-
-        # go back 1 char that was peek ahead to determine if no longer alnum / underscore
-        self.input_file.seek(last_pos)
-        return token
-
-    def _get_string_const(self, starting_char):
-        char = starting_char
-        token = ''
-
-        # add initial "
-        token += char
-        char = self.input_file.read(1)
-
-        # get rest of token up to ending "
-        while not self._is_string_const_delimeter(char):
-            token += char
-            char = self.input_file.read(1)
-
-        # get last "
-        token += char
-        return token
-
-    def _skip_whitespace_and_comments(self, starting_char):
-        char = starting_char
-
-        while char.isspace() or char in self.COMMENT_OPERATORS:
-            if char.isspace():
-                # read 1 char bc we don't know what's next
-                char = self.input_file.read(1)
-            elif char in self.COMMENT_OPERATORS:
-                # make sure comment and not operator
-                last_pos = self.input_file.tell()
-                # read rest of line
-                rest_of_line = self.input_file.readline()
-                if not self._is_start_of_comment(char, rest_of_line):
-                    # go back
-                    self.input_file.seek(last_pos)
-                    # no whitespace / comments left to parse
-                    break
-                else:
-                    # read next char
-                    char = self.input_file.read(1)
-            continue
-        return char
-
-    def _is_alnum_or_underscore(self, char):
-        return char.isalnum() or char == "_"
-
-    def _is_string_const_delimeter(self, char):
-        return char == "\""
-
-    def _is_start_of_comment(self, char, rest_of_line):
-       # comment of form: // or */
-       single_line_comment = rest_of_line[0] == self.COMMENT_OPERATORS[0]
-       # comment of form: /**
-       multi_line_comment = char == self.COMMENT_OPERATORS[0] and rest_of_line[0:2] == "**"
-       # comment of form:  * comment
-       part_of_multi_line_comment = self._part_of_multiline_comment()
-       return single_line_comment or multi_line_comment or part_of_multi_line_comment
-
-    def _part_of_multiline_comment(self):
-        if not self.tokens_found:
-            return True
-        elif self.tokens_found[-1] == ';':
-            return True
-        else:
-            return False
+    def _read_token(self):
+        # the empty end of file token is repeated once the source is exhausted
+        self.last_token_read = next(self.token_stream, None) or self.last_token_read
+        return self.last_token_read
@@ -0,0 +1,79 @@
+import unittest
+from io import StringIO
+
+# add source files to path
+import os, sys
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.append(os.path.join(PROJECT_DIR, 'source'))
+
+from JackTokenizer import JackTokenizer
+from JackParser import JackParser
+from CompilationEngine import CompilationEngine
+from JackAST import BinaryOp, UnaryOp, IntegerConstant, VariableReference, ArrayReference, SubroutineCall, LetStatement
+
+class TestCompilationEngine(unittest.TestCase):
+    PROGRAMS = [
+        'Seven/Main',
+        'Average/Main',
+        'ConvertToBin/Main',
+        'ComplexArrays/Main',
+        'Square/Main',
+        'Square/Square',
+        'Square/SquareGame'
+    ]
+
+    def compile(self, source_code):
+        output_file = StringIO()
+        CompilationEngine(JackTokenizer(StringIO(source_code)), output_file).compile_class()
+        return output_file.getvalue().splitlines()
+
+    def parse_statement(self, statement):
+        source_code = 'class Foo { function void bar() { ' + statement + ' return; } }'
+        class_node = JackParser(JackTokenizer(StringIO(source_code))).parse_class()
+        return class_node.subroutines[0].statements[0]
+
+    def test_compile_class(self):
+        ## IT MATCHES THE REFERENCE VM CODE OF THE TEST PROGRAMS
+        for program in self.PROGRAMS:
+            with open(os.path.join(PROJECT_DIR, program + '.jack')) as jack_file:
+                compiled = self.compile(jack_file.read())
+            with open(os.path.join(PROJECT_DIR, 'expected', program + '.vm')) as vm_file:
+                self.assertEqual(compiled, vm_file.read().splitlines(), program)
+
+    def test_parse_expression(self):
+        ## IT APPLIES OPERATORS LEFT TO RIGHT WITH UNARY OPERATORS BINDING TO THEIR TERM
+        statement = self.parse_statement('let x = -a + b[2] * (c - 1) / Math.max(d, 3);')
+        expected_value = BinaryOp(
+            '/',
+            BinaryOp(
+                '*',
+                BinaryOp('+', UnaryOp('-', VariableReference('a')), ArrayReference('b', IntegerConstant(2))),
+                BinaryOp('-', VariableReference('c'), IntegerConstant(1))
+            ),
+            SubroutineCall('Math', 'max', [VariableReference('d'), IntegerConstant(3)])
+        )
+        self.assertEqual(statement, LetStatement('x', None, expected_value))
+
+    def test_method_calls(self):
+        ## IT PASSES THE OBJECT AS FIRST ARGUMENT TO METHODS
+        compiled = self.compile(
+            'class Foo {\n'
+            '    field Foo next;\n'
+            '    method void bar(int a) { do baz(a); do next.baz(1); return; }\n'
+            '}\n'
+        )
+        self.assertEqual(compiled, [
+            'function Foo.bar 0',
+            'push argument 0', 'pop pointer 0',
+            'push pointer 0', 'push argument 1', 'call Foo.baz 2', 'pop temp 0',
+            'push this 0', 'push constant 1', 'call Foo.baz 2', 'pop temp 0',
+            'push constant 0', 'return'
+        ])
+
+    def test_syntax_error(self):
+        ## IT REPORTS WHERE THE SOURCE STOPS FOLLOWING THE GRAMMAR
+        with self.assertRaisesRegex(ValueError, "expected ';' but found 'let' at line 4 column 5"):
+            self.compile('class Foo {\n  function void bar() {\n    let x = 1\n    let y = 2;\n  }\n}')
+
+if __name__ == '__main__':
+    unittest.main()
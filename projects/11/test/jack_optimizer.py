@@ -0,0 +1,62 @@
+import unittest
+from io import StringIO
+
+# add source files to path
+import os, sys
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.append(os.path.join(PROJECT_DIR, 'source'))
+
+from JackTokenizer import JackTokenizer
+from JackParser import JackParser
+from JackOptimizer import JackOptimizer
+from CompilationEngine import CompilationEngine
+from JackAST import BinaryOp, UnaryOp, IntegerConstant, VariableReference, SubroutineCall, ShiftLeft
+
+class TestJackOptimizer(unittest.TestCase):
+    def optimize(self, expression):
+        source_code = 'class Foo { function void bar() { let x = ' + expression + '; return; } }'
+        class_node = JackParser(JackTokenizer(StringIO(source_code))).parse_class()
+        JackOptimizer().optimize_class(class_node)
+        return class_node.subroutines[0].statements[0].value
+
+    def test_constant_folding(self):
+        ## IT FOLDS CONSTANT EXPRESSIONS ON 16 BITS THE WAY THE VM EVALUATES THEM
+        self.assertEqual(self.optimize('1 + (2 * 3)'), IntegerConstant(7))
+        self.assertEqual(self.optimize('32767 + 1'), UnaryOp('~', IntegerConstant(32767)))
+        self.assertEqual(self.optimize('-7 / 2'), UnaryOp('-', IntegerConstant(3)))
+        self.assertEqual(self.optimize('(2 < 3) & ~false'), UnaryOp('-', IntegerConstant(1)))
+        # left to right, so only the constant prefix folds
+        self.assertEqual(self.optimize('x + 1 + 2'), BinaryOp('+', BinaryOp('+', VariableReference('x'), IntegerConstant(1)), IntegerConstant(2)))
+        self.assertEqual(self.optimize('1 / 0'), BinaryOp('/', IntegerConstant(1), IntegerConstant(0)))
+
+    def test_algebraic_identities(self):
+        ## IT DROPS OPERATIONS THAT LEAVE THE VALUE UNCHANGED
+        self.assertEqual(self.optimize('~~x + 0'), VariableReference('x'))
+        self.assertEqual(self.optimize('(0 + x) * 1 - (3 - 3)'), VariableReference('x'))
+        self.assertEqual(self.optimize('x * (2 - 2)'), IntegerConstant(0))
+
+    def test_multiplication(self):
+        ## IT REPLACES MULTIPLICATIONS BY POWERS OF TWO WITH ADDITIONS
+        self.assertEqual(self.optimize('x * 2'), BinaryOp('+', VariableReference('x'), VariableReference('x')))
+        self.assertEqual(self.optimize('8 * a[i]').shift, 3)
+        self.assertEqual(self.optimize('x * 6'), BinaryOp('*', VariableReference('x'), IntegerConstant(6)))
+        # the call may have side effects
+        call = SubroutineCall('Foo', 'baz', [])
+        self.assertEqual(self.optimize('Foo.baz() * 0'), BinaryOp('*', call, IntegerConstant(0)))
+        self.assertEqual(self.optimize('Foo.baz() * 4'), ShiftLeft(call, 2))
+
+    def test_compile_shift_left(self):
+        ## IT DOUBLES THROUGH A TEMP REGISTER SINCE THE VM CAN'T DUPLICATE THE TOP OF THE STACK
+        output_file = StringIO()
+        source_code = 'class Foo { function int bar(int x) { return x * 4; } }'
+        CompilationEngine(JackTokenizer(StringIO(source_code)), output_file, optimize=True).compile_class()
+        self.assertEqual(output_file.getvalue().splitlines(), [
+            'function Foo.bar 0',
+            'push argument 0',
+            'pop temp 1', 'push temp 1', 'push temp 1', 'add',
+            'pop temp 1', 'push temp 1', 'push temp 1', 'add',
+            'return'
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+from io import StringIO
+from collections import deque
+
+# add source files to path
+import os, sys
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.append(os.path.join(PROJECT_DIR, 'source'))
+
+from JackTokenizer import JackTokenizer
+
+class TestJackTokenizer(unittest.TestCase):
+    def tokenize(self, source_code):
+        self.tokenizer = JackTokenizer(StringIO(source_code))
+        tokens = []
+        while self.tokenizer.has_more_tokens:
+            self.tokenizer.advance()
+            tokens.append(self.tokenizer.current_token)
+
+        # drop the empty end of file token
+        return tokens[:-1]
+
+    def test_advance(self):
+        ## IT TOKENIZES INPUT
+        source_code = (
+            'if (x < 0) {\n'
+            '    let state = "negative";\n'
+            '}'
+        )
+        expected_tokens = ['if', '(', 'x', '<', '0', ')', '{', 'let', 'state', '=', '"negative"', ';', '}']
+        self.assertEqual([token.text for token in self.tokenize(source_code)], expected_tokens)
+
+    def test_token_types(self):
+        ## IT TYPES EACH TOKEN ONCE AND SHARES THE TEXT OF REPEATED TOKENS
+        tokens = self.tokenize('let x_1 = "x_1" + 12; let x_1 = this;')
+        self.assertEqual([token.token_type() for token in tokens[:7]], [
+            'KEYWORD', 'IDENTIFIER', 'SYMBOL', 'STRING_CONST', 'SYMBOL', 'INT_CONST', 'SYMBOL'
+        ])
+        self.assertTrue(tokens[1].is_identifier() and tokens[8].is_identifier())
+        self.assertIs(tokens[1].text, tokens[8].text)
+        self.assertFalse(hasattr(tokens[1], '__dict__'))
+
+    def test_comments(self):
+        ## IT SKIPS ALL KINDS OF COMMENTS BUT KEEPS DIVISION AND MULTIPLICATION
+        source_code = (
+            '/** Main class\n'
+            ' * with a doc comment */\n'
+            'class Main {\n'
+            '    // let x = 1;\n'
+            '    /* a * b / c */ let x = a/b * c; /**/\n'
+            '    let s = "// not a comment";\n'
+            '}\n'
+        )
+        expected_tokens = [
+            'class', 'Main', '{',
+            'let', 'x', '=', 'a', '/', 'b', '*', 'c', ';',
+            'let', 's', '=', '"// not a comment"', ';',
+            '}'
+        ]
+        self.assertEqual([token.text for token in self.tokenize(source_code)], expected_tokens)
+
+    def test_positions(self):
+        ## IT RECORDS THE LINE AND COLUMN WHERE EACH TOKEN STARTS
+        source_code = (
+            'class Main {\n'
+            '  /* one\n'
+            '     two */ field int x_1;\n'
+            '}'
+        )
+        positions = [(token.text, token.line, token.column) for token in self.tokenize(source_code)]
+        self.assertEqual(positions, [
+            ('class', 1, 1), ('Main', 1, 7), ('{', 1, 12),
+            ('field', 3, 13), ('int', 3, 19), ('x_1', 3, 23), (';', 3, 26),
+            ('}', 4, 1)
+        ])
+
+    def test_end_of_file(self):
+        ## IT KEEPS RETURNING THE EMPTY TOKEN ONCE THE SOURCE IS EXHAUSTED
+        self.tokenize('return;')
+        self.assertFalse(self.tokenizer.has_more_tokens)
+        self.assertTrue(self.tokenizer.current_token.is_empty())
+        self.tokenizer.advance()
+        self.assertTrue(self.tokenizer.next_token.is_empty())
+
+    def test_bounded_window(self):
+        ## IT ONLY HOLDS THE CURRENT AND NEXT TOKENS WHATEVER THE SIZE OF THE FILE
+        self.tokenizer = JackTokenizer(StringIO('let x = 1;\n' * 1000))
+        for _ in range(2500):
+            self.tokenizer.advance()
+            containers = [
+                name for name, value in vars(self.tokenizer).items() if isinstance(value, (list, tuple, dict, set, deque))
+            ]
+            self.assertEqual(containers, [])
+
+        self.assertEqual((self.tokenizer.current_token.text, self.tokenizer.current_token.line), (';', 500))
+        self.assertEqual((self.tokenizer.next_token.text, self.tokenizer.next_token.line), ('let', 501))
+
+    def test_errors(self):
+        ## IT REPORTS WHERE THE SOURCE CAN'T BE TOKENIZED
+        for source_code in ['let x = 1;\nlet y = #;', 'let s = "open;\n', 'let x = 1; /* open']:
+            with self.assertRaises(ValueError):
+                self.tokenize(source_code)
+
+        with self.assertRaisesRegex(ValueError, 'line 2 column 9'):
+            self.tokenize('let x = 1;\nlet y = #;')
+
+if __name__ == '__main__':
+    unittest.main()
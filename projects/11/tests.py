@@ -18,12 +18,12 @@ def test_square():
     os.system('python3 ./source/JackCompiler.py ./Square/Main.jack')
     # check main
     os.system('../../tools/TextComparer.sh ./compiled/Square/Main.vm ./expected/Square/Main.vm')
-    #print("SQUARE")
-    #os.system('python3 ./source/JackCompiler.py ./Square/Square.jack')
-    #os.system('../../tools/TextComparer.sh ./compiled/Square/Square.vm ./expected/Square/Square.vm')
-    #print("SQUAREGAME")
-    #os.system('python3 ./source/JackCompiler.py ./Square/SquareGame.jack')
-    #os.system('../../tools/TextComparer.sh ./compiled/Square/SquareGame.vm ./expected/Square/SquareGame.vm')
+    print("SQUARE")
+    os.system('python3 ./source/JackCompiler.py ./Square/Square.jack')
+    os.system('../../tools/TextComparer.sh ./compiled/Square/Square.vm ./expected/Square/Square.vm')
+    print("SQUAREGAME")
+    os.system('python3 ./source/JackCompiler.py ./Square/SquareGame.jack')
+    os.system('../../tools/TextComparer.sh ./compiled/Square/SquareGame.vm ./expected/Square/SquareGame.vm')
 
 
     print("\n")